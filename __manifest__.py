@@ -1,6 +1,6 @@
 {
     'name': 'Tailor Management',
-    'version': '1.0',
+    'version': '1.1',
     'summary': 'Manage tailoring business operations',
     'description': 'Module to manage tailoring orders, users, and roles.',
     'author': 'Uwizeye Tresor',
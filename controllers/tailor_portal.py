@@ -1,9 +1,67 @@
 # -*- coding: utf-8 -*-
-import base64
+import io
 import mimetypes
+import os
+import shutil
+import tempfile
+from functools import lru_cache, wraps
 
-from odoo import http, fields
-from odoo.http import request
+from werkzeug.utils import send_file
+
+# ✅ SIMD base64 when available (same API), stdlib otherwise
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+from odoo import http
+from odoo.http import request, Response
+
+# Uploads are pulled from the werkzeug stream in fixed-size chunks
+_UPLOAD_CHUNK_SIZE = 1 << 20
+# Larger uploads are attached by a queue_job (when installed), not in the HTTP worker
+_DEFERRED_UPLOAD_MIN_SIZE = 2 * 1024 * 1024
+
+# ✅ Portal allowed only invoice/contract (keep your rule)
+_ALLOWED_DOC_TYPES = frozenset(('invoice', 'contract'))
+_DOCS_MODEL = 'customer.documents'
+
+
+@lru_cache(maxsize=256)
+def _guess_mime(ext):
+    """Mimetype for a lowercased file extension (memoized, the mime maps are static)."""
+    return mimetypes.types_map.get(ext) or mimetypes.guess_type('x' + ext)[0] or 'application/octet-stream'
+
+
+def _guess_mime_for(filename):
+    return _guess_mime(os.path.splitext(filename)[1].lower())
+
+
+def _valid_id(value):
+    """Positive int that fits a Postgres integer column, else None (no DB hit)."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if 0 < value < 2 ** 31 else None
+
+
+def _require_owned_doc(fn):
+    """
+    ✅ Shared guard for portal document routes: resolves doc_id into an owned,
+    portal-editable customer.documents and calls fn(self, doc, **kwargs).
+    """
+    @wraps(fn)
+    def wrapper(self, doc_id, **kwargs):
+        if not _valid_id(doc_id):
+            return request.not_found()
+        doc = self._portal_owned_doc(doc_id)
+        if not doc:
+            return request.redirect('/my/tailor-orders')
+        if not self._portal_allowed_doc_type(doc.document_type):
+            return request.redirect(f"/my/tailor-orders/{doc.tailor_order_id.id}")
+        return fn(self, doc, **kwargs)
+    return wrapper
 
 
 class TailorPortal(http.Controller):
@@ -15,6 +73,10 @@ class TailorPortal(http.Controller):
         orders = request.env['sale.order'].sudo().search([
             ('partner_id', '=', partner.id)
         ], order='date_order desc')
+        # ✅ Warm the cache with the list columns only (one bulk SELECT per model)
+        orders.read(['name', 'date_order', 'amount_total', 'state', 'currency_id', 'partner_id'])
+        orders.mapped('currency_id').read(['name', 'symbol', 'position', 'decimal_places'])
+        orders.mapped('partner_id').read(['name'])
         return request.render('tailor_management.portal_orders_list', {
             'orders': orders
         })
@@ -26,6 +88,9 @@ class TailorPortal(http.Controller):
         tailor_orders = request.env['tailor.order'].sudo().search([
             ('partner_id', '=', partner.id)
         ], order='order_date desc')
+        # ✅ Warm the cache with the columns the list template renders
+        tailor_orders.read(['name', 'order_date', 'delivery_date', 'status', 'product_id', 'quantity'])
+        tailor_orders.mapped('product_id').read(['name'])
         return request.render('tailor_management.portal_tailor_orders', {
             'orders': tailor_orders
         })
@@ -33,8 +98,10 @@ class TailorPortal(http.Controller):
     # --- Tailor Order Detail ---
     @http.route(['/my/tailor-orders/<int:order_id>'], type='http', auth="user", website=True)
     def portal_tailor_order_detail(self, order_id, **kwargs):
-        order = request.env['tailor.order'].sudo().browse(order_id)
-        if order.partner_id.commercial_partner_id != request.env.user.partner_id.commercial_partner_id:
+        if not _valid_id(order_id):
+            return request.not_found()
+        order = self._portal_owned_order(order_id)
+        if not order:
             return request.redirect('/my/tailor-orders')
         return request.render('tailor_management.portal_tailor_order_detail', {
             'order': order
@@ -50,72 +117,135 @@ class TailorPortal(http.Controller):
         csrf=True
     )
     def portal_approve_order(self, order_id, **kwargs):
-        order = request.env['tailor.order'].sudo().browse(order_id)
-        if order.partner_id.commercial_partner_id != request.env.user.partner_id.commercial_partner_id:
+        if not _valid_id(order_id):
+            return request.not_found()
+        order = self._portal_owned_order(order_id)
+        if not order:
             return request.redirect('/my/tailor-orders')
 
         # ✅ FIX: Portal customer must ONLY approve (do NOT confirm / change status)
         # Confirming is restricted to Stock Manager / Admin by your model rules.
-        order.write({"customer_approved": True})
+        # Idempotent: a double-click / retry must not re-write the order.
+        if not order.customer_approved:
+            order.write({"customer_approved": True})
 
         return request.redirect(f'/my/tailor-orders/{order_id}')
 
     # ------------------------------------------------------------
     # Helpers (NEW, safe, small)
     # ------------------------------------------------------------
-    def _portal_check_order_owner(self, order):
-        return bool(order and order.partner_id.commercial_partner_id == request.env.user.partner_id.commercial_partner_id)
+    def _portal_commercial_partner_id(self):
+        """Commercial partner id of the portal user, resolved once per request."""
+        cp_id = getattr(request, '_tailor_portal_cp_id', None)
+        if cp_id is None:
+            cp_id = request._tailor_portal_cp_id = request.env.user.commercial_partner_id.id
+        return cp_id
+
+    def _portal_owned_order(self, order_id):
+        """
+        ✅ Fetch tailor.order only if it belongs to the current portal customer.
+        Ownership is checked in the SQL domain (one JOIN), so non-owners get
+        an empty recordset without loading partner records.
+        """
+        return request.env['tailor.order'].sudo().search([
+            ('id', '=', order_id),
+            ('partner_id.commercial_partner_id', '=', self._portal_commercial_partner_id()),
+        ], limit=1)
 
-    def _portal_check_doc_owner(self, doc):
-        return bool(
-            doc and doc.tailor_order_id
-            and doc.tailor_order_id.partner_id.commercial_partner_id == request.env.user.partner_id.commercial_partner_id
-        )
+    def _portal_owned_doc(self, doc_id):
+        """
+        ✅ Same as _portal_owned_order, joining through the linked tailor order.
+        """
+        return request.env[_DOCS_MODEL].sudo().search([
+            ('id', '=', doc_id),
+            ('tailor_order_id.partner_id.commercial_partner_id', '=', self._portal_commercial_partner_id()),
+        ], limit=1)
 
     def _portal_allowed_doc_type(self, doc_type):
-        # ✅ Portal allowed only invoice/contract (keep your rule)
-        return doc_type in ('invoice', 'contract')
+        return doc_type in _ALLOWED_DOC_TYPES
 
     def _portal_add_attachment_to_doc(self, doc, uploaded_file, fallback_name=None):
         """
         ✅ Adds a new ir.attachment linked to customer.documents (multi-file).
         Does NOT delete or replace existing ones.
+        Returns the new attachment; empty when nothing was attached yet
+        (empty upload, or a large one handed to a background job).
         """
         if not uploaded_file or not doc:
-            return False
+            return request.env['ir.attachment']
 
         raw_filename = getattr(uploaded_file, 'filename', False) or ''
         raw_filename = (raw_filename or '').strip()
         safe_filename = raw_filename or (fallback_name or '').strip() or (doc.name or f"document_{doc.id}")
 
-        file_bytes = uploaded_file.read() or b""
-        if not file_bytes:
-            return False
-
-        datas_b64 = base64.b64encode(file_bytes)
+        stream = getattr(uploaded_file, 'stream', None) or uploaded_file
+        mimetype = _guess_mime_for(safe_filename)
 
-        Attachment = request.env['ir.attachment'].sudo()
-        att = Attachment.create({
-            'name': safe_filename,
-            'datas': datas_b64,
-            'res_model': 'customer.documents',
-            'res_id': doc.id,
-            'mimetype': mimetypes.guess_type(safe_filename)[0] or 'application/octet-stream',
-        })
+        # ✅ Big files: spool to disk and finish in a background job
+        if self._portal_upload_deferred(doc, uploaded_file):
+            return self._portal_defer_upload(doc, stream, safe_filename, mimetype)
 
-        # ✅ IMPORTANT: ALWAYS link it to attachment_ids
-        doc.sudo().write({
-            'attachment_ids': [(4, att.id)],
-            'upload_date': fields.Datetime.now(),  # refresh ordering in lists
-        })
+        file_bytes = b"".join(iter(lambda: stream.read(_UPLOAD_CHUNK_SIZE), b""))
+        if not file_bytes:
+            return request.env['ir.attachment']
+
+        return doc._portal_attach_raw(file_bytes, safe_filename, mimetype)
+
+    def _portal_upload_deferred(self, doc, uploaded_file):
+        """True when ``uploaded_file`` is big enough to be attached by a queue_job."""
+        stream = getattr(uploaded_file, 'stream', None) or uploaded_file
+        return hasattr(doc, 'with_delay') and self._portal_upload_size(stream) > _DEFERRED_UPLOAD_MIN_SIZE
+
+    def _portal_redirect_to_order(self, order_id, pending=False):
+        # ✅ tell the customer a deferred upload is still being processed
+        return request.redirect(f'/my/tailor-orders/{order_id}' + ('?upload=processing' if pending else ''))
+
+    def _portal_upload_size(self, stream):
+        """Remaining bytes in a seekable upload stream (0 if it cannot be measured)."""
+        try:
+            pos = stream.tell()
+            stream.seek(0, os.SEEK_END)
+            size = stream.tell()
+            stream.seek(pos)
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return 0
+        return size - pos
+
+    def _portal_defer_upload(self, doc, stream, safe_filename, mimetype):
+        """
+        ✅ Copy the upload into the filestore (chunked, no full buffer) and
+        enqueue customer.documents._portal_finalize_attachment (OCA queue_job).
+        """
+        tmp_dir = doc._portal_upload_spool_dir()
+        os.makedirs(tmp_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+            shutil.copyfileobj(stream, tmp, _UPLOAD_CHUNK_SIZE)
 
-        # ✅ Backward compatibility: also update legacy single file fields to latest
-        doc.sudo().write({
-            'file': datas_b64,
-            'filename': safe_filename,
-        })
+        doc.sudo().with_delay()._portal_finalize_attachment(tmp.name, safe_filename, mimetype)
+        return request.env['ir.attachment']
 
-        return att
+    def _portal_attachment_response(self, att, safe_filename):
+        """
+        ✅ Send an ir.attachment as a download, with ETag / Last-Modified / Range
+        support so unchanged files answer 304 without a body.
+        Filestore files are streamed from disk; only in-DB rows are buffered.
+        """
+        if att.store_fname:
+            path_or_file = att._full_path(att.store_fname)
+        else:
+            path_or_file = io.BytesIO(att.raw)
+
+        return send_file(
+            path_or_file,
+            request.httprequest.environ,
+            mimetype=_guess_mime_for(safe_filename),
+            as_attachment=True,
+            download_name=safe_filename,
+            conditional=True,
+            etag=att.checksum or True,
+            last_modified=att.write_date,
+            response_class=Response,
+        )
 
     # --- Upload Document to Tailor Order ---
     @http.route(
@@ -127,8 +257,10 @@ class TailorPortal(http.Controller):
         csrf=True
     )
     def portal_upload_document(self, order_id, **kwargs):
-        order = request.env['tailor.order'].sudo().browse(order_id)
-        if not self._portal_check_order_owner(order):
+        if not _valid_id(order_id):
+            return request.not_found()
+        order = self._portal_owned_order(order_id)
+        if not order:
             return request.redirect('/my/tailor-orders')
 
         # ✅ FIXED: portal file must be read from request.httprequest.files
@@ -139,7 +271,7 @@ class TailorPortal(http.Controller):
         if not self._portal_allowed_doc_type(doc_type):
             return request.redirect(f'/my/tailor-orders/{order_id}')
 
-        Document = request.env['customer.documents'].sudo()
+        Document = request.env[_DOCS_MODEL].sudo()
 
         # ✅ Always upload into the SAME placeholder doc for (order + type)
         doc = Document.search([
@@ -156,34 +288,25 @@ class TailorPortal(http.Controller):
             doc = Document.create({
                 'name': (kwargs.get('name') or safe_filename).strip(),
                 'document_type': doc_type,
-                'partner_id': order.partner_id.commercial_partner_id.id,
+                'partner_id': self._portal_commercial_partner_id(),
                 'tailor_order_id': order.id,
                 'uploaded_by': request.env.user.id,
                 'description': (kwargs.get('description', '') or '').strip(),
             })
 
         # ✅ Add uploaded file as attachment
+        pending = bool(uploaded_file) and self._portal_upload_deferred(doc, uploaded_file)
         if uploaded_file:
             self._portal_add_attachment_to_doc(doc, uploaded_file, fallback_name=kwargs.get('name'))
 
-        return request.redirect(f'/my/tailor-orders/{order_id}')
+        return self._portal_redirect_to_order(order_id, pending)
 
     # ------------------------------------------------------------
     # ✅ Add file to a SPECIFIC document (GET)
     # ------------------------------------------------------------
     @http.route(['/my/documents/<int:doc_id>/add-file'], type='http', auth='user', website=True)
-    def portal_document_add_file(self, doc_id, **kwargs):
-        doc = request.env['customer.documents'].sudo().browse(doc_id)
-
-        if not doc or not doc.tailor_order_id:
-            return request.not_found()
-
-        if not self._portal_check_doc_owner(doc):
-            return request.redirect('/my/tailor-orders')
-
-        if not self._portal_allowed_doc_type(doc.document_type):
-            return request.redirect(f"/my/tailor-orders/{doc.tailor_order_id.id}")
-
+    @_require_owned_doc
+    def portal_document_add_file(self, doc, **kwargs):
         return request.render('tailor_management.portal_document_add_file', {
             'doc': doc,
             'order': doc.tailor_order_id,
@@ -200,39 +323,20 @@ class TailorPortal(http.Controller):
         methods=['POST'],
         csrf=True
     )
-    def portal_document_add_file_post(self, doc_id, **kwargs):
-        doc = request.env['customer.documents'].sudo().browse(doc_id)
-
-        if not doc or not doc.tailor_order_id:
-            return request.not_found()
-
-        if not self._portal_check_doc_owner(doc):
-            return request.redirect('/my/tailor-orders')
-
-        if not self._portal_allowed_doc_type(doc.document_type):
-            return request.redirect(f"/my/tailor-orders/{doc.tailor_order_id.id}")
-
+    @_require_owned_doc
+    def portal_document_add_file_post(self, doc, **kwargs):
         uploaded_file = request.httprequest.files.get('file')
 
+        pending = bool(uploaded_file) and self._portal_upload_deferred(doc, uploaded_file)
         if uploaded_file:
             self._portal_add_attachment_to_doc(doc, uploaded_file, fallback_name=(kwargs.get('name') or doc.name))
 
-        return request.redirect(f"/my/tailor-orders/{doc.tailor_order_id.id}")
+        return self._portal_redirect_to_order(doc.tailor_order_id.id, pending)
 
     # --- Edit Customer Document (GET) ---
     @http.route(['/my/documents/<int:doc_id>/edit'], type='http', auth='user', website=True)
-    def portal_edit_document(self, doc_id, **kwargs):
-        doc = request.env['customer.documents'].sudo().browse(doc_id)
-
-        if not doc or not doc.tailor_order_id:
-            return request.not_found()
-
-        if not self._portal_check_doc_owner(doc):
-            return request.redirect('/my/tailor-orders')
-
-        if not self._portal_allowed_doc_type(doc.document_type):
-            return request.redirect(f"/my/tailor-orders/{doc.tailor_order_id.id}")
-
+    @_require_owned_doc
+    def portal_edit_document(self, doc, **kwargs):
         return request.render('tailor_management.portal_document_edit', {
             'doc': doc
         })
@@ -246,43 +350,31 @@ class TailorPortal(http.Controller):
         methods=['POST'],
         csrf=True
     )
-    def portal_edit_document_post(self, doc_id, **kwargs):
-        doc = request.env['customer.documents'].sudo().browse(doc_id)
-
-        if not doc or not doc.tailor_order_id:
-            return request.not_found()
-
-        if not self._portal_check_doc_owner(doc):
-            return request.redirect('/my/tailor-orders')
-
-        if not self._portal_allowed_doc_type(doc.document_type):
-            return request.redirect(f"/my/tailor-orders/{doc.tailor_order_id.id}")
-
+    @_require_owned_doc
+    def portal_edit_document_post(self, doc, **kwargs):
         # ✅ FIXED: portal file must be read from request.httprequest.files
         uploaded_file = request.httprequest.files.get('file')
 
+        pending = bool(uploaded_file) and self._portal_upload_deferred(doc, uploaded_file)
         if uploaded_file:
             self._portal_add_attachment_to_doc(doc, uploaded_file, fallback_name=doc.name)
 
-        return request.redirect(f"/my/tailor-orders/{doc.tailor_order_id.id}")
+        return self._portal_redirect_to_order(doc.tailor_order_id.id, pending)
 
     # --- Download Customer Document ---
     @http.route(['/my/documents/<int:doc_id>/download'], type='http', auth='user', website=True)
     def portal_download_document(self, doc_id, **kwargs):
-        doc = request.env['customer.documents'].sudo().browse(doc_id)
-
-        if not doc or not doc.tailor_order_id:
+        if not _valid_id(doc_id):
             return request.not_found()
-
-        if not self._portal_check_doc_owner(doc):
+        doc = self._portal_owned_doc(doc_id)
+        if not doc:
             return request.not_found()
 
         # ✅ NEW: If att_id is provided, download THAT attachment
         att_id = kwargs.get('att_id')
         if att_id:
-            try:
-                att_id = int(att_id)
-            except Exception:
+            att_id = _valid_id(att_id)
+            if not att_id:
                 return request.not_found()
 
             att = request.env['ir.attachment'].sudo().browse(att_id)
@@ -290,58 +382,38 @@ class TailorPortal(http.Controller):
                 return request.not_found()
 
             # ✅ Security: attachment must belong to this document
-            if att.res_model != 'customer.documents' or att.res_id != doc.id:
+            if att.res_model != _DOCS_MODEL or att.res_id != doc.id:
                 return request.not_found()
 
-            if not att.datas:
+            if not (att.store_fname or att.db_datas):
                 return request.not_found()
 
-            filecontent = base64.b64decode(att.datas)
-            safe_filename = att.name or f"document_{doc.id}"
-            content_type, _ = mimetypes.guess_type(safe_filename)
-            if not content_type:
-                content_type = 'application/octet-stream'
-
-            return request.make_response(
-                filecontent,
-                headers=[
-                    ('Content-Type', content_type),
-                    ('Content-Disposition', f'attachment; filename=\"{safe_filename}\"')
-                ]
-            )
-
-        # ✅ Otherwise fallback: latest attachment if exists
-        if 'attachment_ids' in doc._fields and doc.attachment_ids:
-            att = doc.attachment_ids.sorted(lambda a: (a.create_date or fields.Datetime.now(), a.id))[-1]
-            if not att or not att.datas:
+            return self._portal_attachment_response(att, att.name or f"document_{doc.id}")
+
+        # ✅ Otherwise fallback: newest non-empty file of the document itself
+        # (attachment_ids only: chatter / log-note attachments are never served)
+        att = request.env['ir.attachment']
+        if doc.attachment_ids:
+            att = att.sudo().search([
+                ('id', 'in', doc.attachment_ids.ids),
+                ('file_size', '>', 0),
+            ], order='create_date desc, id desc', limit=1)
+        if att:
+            if not (att.store_fname or att.db_datas):
                 return request.not_found()
 
-            filecontent = base64.b64decode(att.datas)
-            safe_filename = att.name or f"document_{doc.id}"
-            content_type, _ = mimetypes.guess_type(safe_filename)
-            if not content_type:
-                content_type = 'application/octet-stream'
-
-            return request.make_response(
-                filecontent,
-                headers=[
-                    ('Content-Type', content_type),
-                    ('Content-Disposition', f'attachment; filename=\"{safe_filename}\"')
-                ]
-            )
+            return self._portal_attachment_response(att, att.name or f"document_{doc.id}")
 
         # ✅ Legacy fallback
         if not doc.file:
             return request.not_found()
 
-        filecontent = base64.b64decode(doc.file)
+        filecontent = base64.b64decode(doc.file, validate=False)
         safe_filename = doc.filename or doc.name or f"document_{doc.id}"
         if not isinstance(safe_filename, str):
             safe_filename = f"document_{doc.id}"
 
-        content_type, _ = mimetypes.guess_type(safe_filename)
-        if not content_type:
-            content_type = 'application/octet-stream'
+        content_type = _guess_mime_for(safe_filename)
 
         return request.make_response(
             filecontent,
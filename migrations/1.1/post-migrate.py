@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """
+    customer.documents.file is no longer stored: it is computed from the
+    latest attachment_ids entry. Drop the legacy res_field='file' copies
+    whose checksum matches a linked attachment, and re-link the rest as regular
+    document attachments so no file is lost.
+    """
+    if not version:
+        return
+
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    legacy = env["ir.attachment"].sudo().search([
+        ("res_model", "=", "customer.documents"),
+        ("res_field", "=", "file"),
+    ])
+    if not legacy:
+        return
+
+    Document = env["customer.documents"].sudo()
+    duplicates = env["ir.attachment"]
+
+    for att in legacy:
+        doc = Document.browse(att.res_id).exists()
+        # only a byte-identical copy of a linked attachment is a duplicate
+        if doc and att.checksum and att.checksum in (doc.attachment_ids - att).mapped("checksum"):
+            duplicates |= att
+            continue
+
+        att.write({
+            "res_field": False,
+            "name": (doc.filename or doc.name or att.name) if doc else att.name,
+        })
+        if doc:
+            doc.write({"attachment_ids": [(4, att.id)]})
+
+    if duplicates:
+        duplicates.unlink()
+
+    _logger.info(
+        "customer.documents legacy files: %s duplicates removed, %s re-linked",
+        len(duplicates), len(legacy) - len(duplicates),
+    )
@@ -1,4 +1,4 @@
-from odoo import models, fields
+from odoo import api, models, fields, tools
 
 
 class ResConfigSettings(models.TransientModel):
@@ -17,3 +17,14 @@ class ResConfigSettings(models.TransientModel):
         default='change-me',
         help='Shared token used by Odoo when calling the AI service.',
     )
+
+    @api.model
+    @tools.ormcache()
+    def _get_ai_config(self):
+        """(url, token) of the AI service, memoized per registry.
+        set_param() clears the registry cache, so saving settings invalidates it."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return (
+            ICP.get_param('tailor_management.ai_service_url') or '',
+            ICP.get_param('tailor_management.ai_service_token') or '',
+        )
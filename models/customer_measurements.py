@@ -47,10 +47,12 @@ class CustomerMeasurements(models.Model):
     ai_raw_json = fields.Text(string='AI Raw Result (JSON)', readonly=True)
 
     # Computed name for display
-    display_name = fields.Char(compute="_compute_display_name", store=True)
+    display_name = fields.Char(compute="_compute_display_name", store=True, precompute=True, index="trigram")
 
     @api.depends('partner_id', 'measurement_date')
     def _compute_display_name(self):
+        # one batched read of partner names instead of a lazy load per record
+        self.mapped('partner_id').read(['name'])
         for rec in self:
             customer = rec.partner_id.name or "Customer"
             date = rec.measurement_date or "No Date"
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from collections import defaultdict
+
 from odoo import models, fields, api
 from odoo.exceptions import UserError
 from odoo.tools.translate import _
@@ -106,67 +108,91 @@ class MrpProduction(models.Model):
 
     measurements_ids = fields.Many2many("customer.measurements", string="Tailor Measurements")
 
+    # ✅ served from the partner's One2many (newest first, see res.partner.measurements_ids)
     customer_measurement_history_ids = fields.One2many(
-        "customer.measurements",
-        compute="_compute_customer_measurement_history",
+        related="partner_id.measurements_ids",
         string="Customer Measurement History",
         readonly=True,
     )
 
-    @api.depends("partner_id")
-    def _compute_customer_measurement_history(self):
-        for mo in self:
-            if mo.partner_id:
-                mo.customer_measurement_history_ids = self.env["customer.measurements"].sudo().search(
-                    [("partner_id", "=", mo.partner_id.id)],
-                    order="measurement_date desc",
-                )
-            else:
-                mo.customer_measurement_history_ids = False
+    # ------------------------------------------------------------
+    # Prefetch
+    # ------------------------------------------------------------
+    _TAILOR_PREFETCH_FIELDS = [
+        "name", "status", "partner_id", "tailor_id", "delivery_date", "sale_order_id",
+        "stock_checked", "admin_materials_approved", "qc_approved", "qc_manager_comment",
+        "garment_template", "length", "shoulder", "sleeve_length", "chest", "waist", "hip",
+        "neck", "bottom_width", "front_design", "sleeve_style", "collar_style", "cuff_style",
+        "buttons_type", "stitching_type", "pocket_pen_big", "pocket_pen_small", "pocket_front",
+        "pocket_key_left", "pocket_key_right", "fabric_preference", "style_preference",
+        "fitting_style", "measurement_notes",
+    ]
+
+    def _prefetch_tailor_fields(self):
+        # ✅ one read() warms the cache for every mo.tailor_order_id.* access below
+        orders = self.mapped("tailor_order_id").filtered("id")
+        if orders:
+            orders.read(self._TAILOR_PREFETCH_FIELDS)
 
     # ------------------------------------------------------------
     # Sync helpers
     # ------------------------------------------------------------
     def _sync_tailor_order_from_mo(self):
+        self._prefetch_tailor_fields()
+        # ✅ one write per target status instead of one per MO
+        TailorOrder = self.env["tailor.order"]
+        by_status = defaultdict(lambda: TailorOrder)
         for mo in self:
             if mo.tailor_order_id and mo.tailor_order_id.status != mo.tailor_status:
-                mo.tailor_order_id.sudo().write({"status": mo.tailor_status})
+                by_status[mo.tailor_status] |= mo.tailor_order_id
+
+        for status, orders in by_status.items():
+            orders.sudo().write({"status": status})
 
     def _push_ready_delivery_to_tailor(self):
-        for mo in self:
-            if mo.tailor_status != "ready_delivery":
-                mo.with_context(skip_tailor_push=True).write({"tailor_status": "ready_delivery"})
-            if mo.tailor_order_id and mo.tailor_order_id.status != "ready_delivery":
-                mo.tailor_order_id.sudo().write({"status": "ready_delivery"})
+        self._prefetch_tailor_fields()
+        to_flip = self.filtered(lambda m: m.tailor_status != "ready_delivery")
+        if to_flip:
+            to_flip.with_context(skip_tailor_push=True).write({"tailor_status": "ready_delivery"})
+
+        linked_orders = self.mapped("tailor_order_id")
+        orders = linked_orders.filtered(lambda t: t.status != "ready_delivery")
+        if orders:
+            orders.sudo().write({"status": "ready_delivery"})
 
-            # ✅ Create Delivery activity when MO done
-            if mo.tailor_order_id:
-                mo.tailor_order_id._schedule_stage_activity("ready_delivery")
+        # ✅ Create Delivery activity when MO done (one batch for all orders)
+        if linked_orders:
+            linked_orders._schedule_stage_activity("ready_delivery")
 
     # ------------------------------------------------------------
     # ✅ QC gate (BLOCK produce all / mark done unless QC approved)
     # ------------------------------------------------------------
     def _check_tailor_qc_before_done(self):
-        for mo in self:
-            if mo.tailor_order_id and not mo.tailor_order_id.qc_approved:
-                raise UserError(_("You cannot complete this Manufacturing Order until QC is approved by a manager."))
+        self._prefetch_tailor_fields()
+        linked = self.filtered("tailor_order_id")
+        if linked.filtered(lambda m: not m.tailor_order_id.qc_approved):
+            raise UserError(_("You cannot complete this Manufacturing Order until QC is approved by a manager."))
 
     # ------------------------------------------------------------
     # ONLY 3 buttons in MO
     # ------------------------------------------------------------
     def _check_materials_gate_before_production(self):
-        for mo in self:
-            if mo.tailor_order_id:
-                if not mo.stock_checked:
-                    raise UserError(_(
-                        "Production cannot start yet.\n"
-                        "Stock Manager must Check & Reserve Materials on the Tailor Order first."
-                    ))
-                if not mo.admin_materials_approved:
-                    raise UserError(_(
-                        "Production cannot start yet.\n"
-                        "A Manager must Approve Materials on the Tailor Order first."
-                    ))
+        self._prefetch_tailor_fields()
+        linked = self.filtered("tailor_order_id")
+        if not linked:
+            return
+
+        # ✅ stock check is reported first, as before
+        if linked.filtered(lambda m: not m.stock_checked):
+            raise UserError(_(
+                "Production cannot start yet.\n"
+                "Stock Manager must Check & Reserve Materials on the Tailor Order first."
+            ))
+        if linked.filtered(lambda m: not m.admin_materials_approved):
+            raise UserError(_(
+                "Production cannot start yet.\n"
+                "A Manager must Approve Materials on the Tailor Order first."
+            ))
 
     def action_mo_cutting(self):
         self._check_materials_gate_before_production()
@@ -179,87 +205,134 @@ class MrpProduction(models.Model):
     def action_send_to_admin(self):
         self._check_materials_gate_before_production()
         self.write({"tailor_status": "qc"})
-        # ✅ Create QC activity
-        for mo in self:
-            if mo.tailor_order_id:
-                mo.tailor_order_id._schedule_stage_activity("qc")
+        # ✅ Create QC activity (one batch for all orders)
+        to_notify = self.mapped("tailor_order_id")
+        if to_notify:
+            to_notify._schedule_stage_activity("qc")
 
     # ------------------------------------------------------------
     # Auto-link Tailor Order to MO + fill customer/tailor/dates
     # ------------------------------------------------------------
     def _try_link_tailor_order(self):
-        for mo in self:
-            tailor = mo.tailor_order_id
-
-            if tailor:
-                if not mo.partner_id and getattr(tailor, "partner_id", False):
-                    mo.partner_id = tailor.partner_id.id
-
-                if not mo.tailor_id and getattr(tailor, "tailor_id", False):
-                    try:
-                        comodel = tailor._fields["tailor_id"].comodel_name
-                    except Exception:
-                        comodel = None
-
-                    if comodel == "res.users":
-                        mo.tailor_id = tailor.tailor_id.partner_id.id if tailor.tailor_id else False
-                    else:
-                        mo.tailor_id = tailor.tailor_id.id
-
-                if not mo.delivery_date and getattr(tailor, "delivery_date", False):
-                    mo.delivery_date = tailor.delivery_date
-
-                if "is_tailoring_order" in mo._fields and not mo.is_tailoring_order:
-                    mo.is_tailoring_order = True
-
-                measures = self.env["customer.measurements"].sudo().search(
-                    [("partner_id", "=", mo.partner_id.id)] if mo.partner_id else [],
-                    order="measurement_date desc",
-                )
-                if measures:
-                    mo.measurements_ids = [(6, 0, measures.ids)]
-                continue
-
+        linked = self.filtered("tailor_order_id")
+        (self - linked)._relink_unlinked()
+        linked._refresh_linked()
+
+    def _relink_unlinked(self):
+        """Find a Tailor Order for MOs without one, then refresh the ones found."""
+        unlinked = self.filtered(lambda m: not m.tailor_order_id)
+        if not unlinked:
+            return
+
+        # ✅ Batched lookups: one search per kind for the whole recordset
+        TailorOrder = self.env["tailor.order"]
+        sale_ids = list({mo.sale_order_id.id for mo in unlinked if mo.sale_order_id})
+        origins = list({mo.origin for mo in unlinked if mo.origin})
+
+        tailor_by_sale = {}
+        if sale_ids:
+            for t in TailorOrder.search([("sale_order_id", "in", sale_ids)]):
+                tailor_by_sale.setdefault(t.sale_order_id.id, t)
+
+        tailor_by_name = {}
+        if origins:
+            for t in TailorOrder.search([("name", "in", origins)]):
+                tailor_by_name.setdefault(t.name, t)
+
+        found_mos = self.browse()
+        for mo in unlinked:
             found = False
             if mo.sale_order_id:
-                found = self.env["tailor.order"].search([("sale_order_id", "=", mo.sale_order_id.id)], limit=1)
+                found = tailor_by_sale.get(mo.sale_order_id.id, False)
 
             if not found and mo.origin:
-                found = self.env["tailor.order"].search([("name", "=", mo.origin)], limit=1)
+                found = tailor_by_name.get(mo.origin, False)
 
             if found:
                 mo.tailor_order_id = found.id
+                found_mos |= mo
+
+        found_mos._refresh_linked()
+
+    def _refresh_linked(self):
+        """Copy customer/tailor/date defaults and measurements from the linked Tailor Order."""
+        linked = self.filtered("tailor_order_id")
+        if not linked:
+            return
+
+        linked._prefetch_tailor_fields()
+        tailor_comodel = self.env["tailor.order"]._fields["tailor_id"].comodel_name
+
+        # ✅ One measurements search for every customer the MOs will end up with
+        partner_ids = list({
+            (mo.partner_id or mo.tailor_order_id.partner_id).id
+            for mo in linked
+            if mo.partner_id or mo.tailor_order_id.partner_id
+        })
+        Measurements = self.env["customer.measurements"].sudo()
+        measures_by_partner = defaultdict(list)
+        if partner_ids:
+            for m in Measurements.search(
+                    [("partner_id", "in", partner_ids)],
+                    order="partner_id, measurement_date desc",
+            ):
+                measures_by_partner[m.partner_id.id].append(m.id)
+
+        # ✅ MOs ending up with identical values share one write
+        groups = {}
+        for mo in linked:
+            vals = self._tailor_default_vals(mo, mo.tailor_order_id, tailor_comodel, measures_by_partner)
+            if not vals:
+                continue
+            key = tuple(sorted(
+                (name, tuple(value[0][2]) if name == "measurements_ids" else value)
+                for name, value in vals.items()
+            ))
+            groups.setdefault(key, [vals, self.browse()])[1] |= mo
+
+        for vals, mos in groups.values():
+            real = mos.filtered("id")
+            if real:
+                real.write(vals)
+            # onchange (NewId) records only get their cache updated
+            if mos - real:
+                (mos - real).update(vals)
+
+    def _tailor_default_vals(self, mo, tailor, tailor_comodel, measures_by_partner):
+        """Return the values to copy from ``tailor`` onto ``mo`` (empty dict if none)."""
+        vals = {}
+
+        partner = mo.partner_id or tailor.partner_id
+        if not mo.partner_id and tailor.partner_id:
+            vals["partner_id"] = tailor.partner_id.id
+
+        if not mo.tailor_id and tailor.tailor_id:
+            if tailor_comodel == "res.users":
+                vals["tailor_id"] = tailor.tailor_id.partner_id.id
+            else:
+                vals["tailor_id"] = tailor.tailor_id.id
 
-                if not mo.partner_id and getattr(found, "partner_id", False):
-                    mo.partner_id = found.partner_id.id
-
-                if not mo.tailor_id and getattr(found, "tailor_id", False):
-                    try:
-                        comodel = found._fields["tailor_id"].comodel_name
-                    except Exception:
-                        comodel = None
-
-                    if comodel == "res.users":
-                        mo.tailor_id = found.tailor_id.partner_id.id if found.tailor_id else False
-                    else:
-                        mo.tailor_id = found.tailor_id.id
+        if not mo.delivery_date and tailor.delivery_date:
+            vals["delivery_date"] = tailor.delivery_date
 
-                if not mo.delivery_date and getattr(found, "delivery_date", False):
-                    mo.delivery_date = found.delivery_date
+        if not mo.is_tailoring_order:
+            vals["is_tailoring_order"] = True
 
-                if "is_tailoring_order" in mo._fields and not mo.is_tailoring_order:
-                    mo.is_tailoring_order = True
+        measure_ids = measures_by_partner.get(partner.id)
+        if measure_ids and set(measure_ids) != set(mo.measurements_ids._origin.ids):
+            vals["measurements_ids"] = [(6, 0, measure_ids)]
 
-                measures = self.env["customer.measurements"].sudo().search(
-                    [("partner_id", "=", mo.partner_id.id)] if mo.partner_id else [],
-                    order="measurement_date desc",
-                )
-                if measures:
-                    mo.measurements_ids = [(6, 0, measures.ids)]
+        return vals
 
     @api.onchange("sale_order_id", "origin", "tailor_order_id")
     def _onchange_try_link_tailor_order(self):
-        self._try_link_tailor_order()
+        # ✅ link and customer unchanged since last save: nothing to refresh
+        to_link = self.filtered(lambda m: not (
+            m.tailor_order_id
+            and m.tailor_order_id == m._origin.tailor_order_id
+            and m.partner_id == m._origin.partner_id
+        ))
+        to_link._try_link_tailor_order()
 
     @api.model_create_multi
     def create(self, vals_list):
@@ -270,7 +343,13 @@ class MrpProduction(models.Model):
     # ------------------------------------------------------------
     # Hooks
     # ------------------------------------------------------------
+    _TAILOR_WRITE_HOOK_KEYS = frozenset(("state", "tailor_status", "sale_order_id", "origin", "tailor_order_id"))
+
     def write(self, vals):
+        # ✅ nothing tailor-related in vals: plain write
+        if self._TAILOR_WRITE_HOOK_KEYS.isdisjoint(vals):
+            return super().write(vals)
+
         # ✅ block state done
         if vals.get("state") == "done":
             self._check_tailor_qc_before_done()
@@ -281,8 +360,11 @@ class MrpProduction(models.Model):
 
         res = super().write(vals)
 
-        if "sale_order_id" in vals or "origin" in vals or "tailor_order_id" in vals:
+        # ✅ only (re)link the records that need it
+        if "tailor_order_id" in vals:
             self._try_link_tailor_order()
+        elif "sale_order_id" in vals or "origin" in vals:
+            self._relink_unlinked()
 
         if "tailor_status" in vals and not self.env.context.get("skip_tailor_push"):
             self._sync_tailor_order_from_mo()
@@ -296,9 +378,9 @@ class MrpProduction(models.Model):
         self._check_tailor_qc_before_done()
         res = super().button_mark_done()
 
-        for mo in self:
-            if mo.state == "done":
-                mo._push_ready_delivery_to_tailor()
+        done = self.filtered(lambda m: m.state == "done")
+        if done:
+            done._push_ready_delivery_to_tailor()
         return res
 
     def _post_inventory(self, *args, **kwargs):
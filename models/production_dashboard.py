@@ -1,11 +1,40 @@
 # -*- coding: utf-8 -*-
 import logging
-from datetime import datetime, date, timedelta
+from types import MappingProxyType
+from datetime import datetime, date, time, timedelta
 
-from odoo import models, api, fields
+from odoo import models, api, fields, tools
+from odoo.tools import SQL
+from odoo.tools.misc import format_date
 
 _logger = logging.getLogger(__name__)
 
+WIP_STATES = ("confirmed", "cutting", "sewing", "qc", "ready_delivery")
+
+# Core tailor.order workflow keys (Arabic labels)
+AR_STATUS = MappingProxyType({
+    "draft": "مسودة",
+    "confirmed": "مؤكد",
+    "cutting": "جاهز للقص",
+    "sewing": "الخياطة",
+    "qc": "فحص الجودة",
+    "ready_delivery": "جاهز للتسليم",
+    "delivered": "تم التسليم",
+    "cancel": "ملغي",
+})
+
+
+def month_trunc_sql(env, model, field_name):
+    """
+    date_trunc('month', field) in the user's timezone, like read_group's :month.
+    The result is a naive *local* datetime: label it from its .date().
+    """
+    column = SQL.identifier(model._table, field_name)
+    tz = env.context.get("tz")
+    if model._fields[field_name].type == "datetime" and tz:
+        column = SQL("timezone(%s, timezone('UTC', %s))", tz, column)
+    return SQL("date_trunc('month', %s)", column)
+
 
 class TailorProductionDashboard(models.AbstractModel):
     _name = "tailor.production.dashboard"
@@ -33,7 +62,12 @@ class TailorProductionDashboard(models.AbstractModel):
         return df, dt, company_id, only_fabrics
 
     def _pick_first_existing_field(self, model, candidates, default=None):
-        flds = model._fields
+        return self._resolved_field(model._name, tuple(candidates), default)
+
+    @tools.ormcache("model_name", "candidates", "default")
+    def _resolved_field(self, model_name, candidates, default=None):
+        # field sets only change with the registry: resolve once per process
+        flds = self.env[model_name]._fields
         for name in candidates:
             if name in flds:
                 return name
@@ -51,24 +85,110 @@ class TailorProductionDashboard(models.AbstractModel):
             domain.append((field_name, "<=", end_dt))
         return domain
 
-    def _to_dt(self, v):
-        if not v:
-            return False
-        if isinstance(v, datetime):
-            return v
-        if isinstance(v, date):
-            return datetime(v.year, v.month, v.day, 0, 0, 0)
-        # strings
-        try:
-            d = fields.Date.from_string(v)
-            if d:
-                return datetime(d.year, d.month, d.day, 0, 0, 0)
-        except Exception:
-            pass
-        try:
-            return fields.Datetime.from_string(v)
-        except Exception:
-            return False
+    def _avg_days_sql(self, model, domain, start_fields, end_fields):
+        """
+        AVG(end - start) in days over ``domain``, computed by PostgreSQL.
+        start/end are the first non-null of the given stored fields; rows
+        where end < start are ignored.
+        """
+        start_fields = [f for f in start_fields if f in model._fields and model._fields[f].store]
+        end_fields = [f for f in end_fields if f in model._fields and model._fields[f].store]
+        if not start_fields or not end_fields:
+            return 0.0
+
+        def _coalesce(names):
+            return SQL("COALESCE(%s)", SQL(", ").join(
+                SQL("%s::timestamp", SQL.identifier(model._table, name)) for name in names
+            ))
+
+        query = model._where_calc(domain)
+        self.env.cr.execute(SQL(
+            """
+            SELECT AVG(EXTRACT(EPOCH FROM (t.end_at - t.start_at)) / 86400.0)
+              FROM (SELECT %s AS start_at, %s AS end_at FROM %s WHERE %s) t
+             WHERE t.end_at >= t.start_at
+            """,
+            _coalesce(start_fields), _coalesce(end_fields), query.from_clause, query.where_clause or SQL("TRUE"),
+        ))
+        return float(self.env.cr.fetchone()[0] or 0.0)
+
+    def _day_domain(self, model, field_name, op, day):
+        """Domain for ``field_name``'s date part ``op`` ``day`` (op is "<" or "=")."""
+        if model._fields[field_name].type == "date":
+            return [(field_name, op, day)]
+        start = datetime.combine(day, time.min)
+        if op == "<":
+            return [(field_name, "<", start)]
+        return ["&", (field_name, ">=", start), (field_name, "<", start + timedelta(days=1))]
+
+    def _due_domain(self, model, deadline_field, op, day):
+        """Deadline ``op`` day, falling back to delivery_date when there is no deadline."""
+        delivery = self._day_domain(model, "delivery_date", op, day)
+        if not deadline_field:
+            return delivery
+        return ["|"] + self._day_domain(model, deadline_field, op, day) + ["&", (deadline_field, "=", False)] + delivery
+
+    def _monthly_wip_and_throughput(self, model, domain, status_field, wip_date_field, done_date_field):
+        """
+        One scan of ``model`` for both trend charts: WIP orders per month of
+        ``wip_date_field`` and delivered orders per month of ``done_date_field``.
+        Yields ("wip" | "delivered", month, count), months ascending, unknown last.
+        """
+        query = model._where_calc(domain)
+        status = SQL.identifier(model._table, status_field)
+        self.env.cr.execute(SQL(
+            """
+            SELECT GROUPING(t.wip_m) AS is_done_set, COALESCE(t.wip_m, t.done_m) AS m,
+                   COUNT(*) FILTER (WHERE t.st IN %(wip_states)s) AS wip,
+                   COUNT(*) FILTER (WHERE t.st = 'delivered') AS delivered
+              FROM (SELECT %(wip_m)s AS wip_m, %(done_m)s AS done_m, %(status)s AS st
+                      FROM %(from_clause)s
+                     WHERE %(where_clause)s) t
+          GROUP BY GROUPING SETS ((t.wip_m), (t.done_m))
+          ORDER BY is_done_set, m NULLS LAST
+            """,
+            wip_states=tuple(WIP_STATES),
+            wip_m=month_trunc_sql(self.env, model, wip_date_field),
+            done_m=month_trunc_sql(self.env, model, done_date_field),
+            status=status,
+            from_clause=query.from_clause,
+            where_clause=query.where_clause or SQL("TRUE"),
+        ))
+        for is_done_set, month, wip, delivered in self.env.cr.fetchall():
+            if is_done_set and delivered:
+                yield "delivered", month, delivered
+            elif not is_done_set and wip:
+                yield "wip", month, wip
+
+    def _month_label(self, month):
+        # localized "MMMM yyyy" as read_group's :month labels; the month is already
+        # local (see month_trunc_sql), so format its date part to avoid a second tz shift
+        if not month:
+            return "Unknown"
+        return format_date(self.env, month.date(), date_format="MMMM yyyy")
+
+    def _due_preview_rows(self, model, domain, deadline_field, field_names, limit=10):
+        """
+        First ``limit`` rows of ``domain`` by due day (deadline, else delivery
+        date), sorted by PostgreSQL instead of in Python.
+        """
+        query = model._where_calc(domain)
+        due = [SQL("%s::date", SQL.identifier(model._table, "delivery_date"))]
+        if deadline_field:
+            due.insert(0, SQL("%s::date", SQL.identifier(model._table, deadline_field)))
+        query.order = SQL(
+            "COALESCE(%s) ASC NULLS LAST, %s",
+            SQL(", ").join(due), SQL.identifier(model._table, "id"),
+        )
+        query.limit = limit
+        return model.browse(query.get_result_ids()).read(field_names, load=None)
+
+    def _names_by_id(self, model_name, ids):
+        ids = [i for i in ids if i]
+        if not ids:
+            return {}
+        records = self.env[model_name].sudo().browse(ids).with_context(prefetch_fields=False)
+        return {r["id"]: r["name"] or "" for r in records.read(["name"])}
 
     def _date_only(self, v):
         if not v:
@@ -79,24 +199,6 @@ class TailorProductionDashboard(models.AbstractModel):
             return v
         return False
 
-    def _safe_month_label(self, val):
-        if not val:
-            return "Unknown"
-        if isinstance(val, datetime):
-            return val.strftime("%B %Y")
-        if isinstance(val, date):
-            return val.strftime("%B %Y")
-        if isinstance(val, str):
-            s = val.strip()
-            try:
-                d = fields.Date.from_string(s)
-                if d:
-                    return d.strftime("%B %Y")
-            except Exception:
-                pass
-            return s
-        return str(val)
-
     def _rg_count(self, row):
         return (
             row.get("__count")
@@ -114,30 +216,182 @@ class TailorProductionDashboard(models.AbstractModel):
         lang = (self.env.context.get("lang") or self.env.user.lang or "")
         return lang.startswith("ar")
 
-    def _status_label(self, key, fallback_labels=None):
-        """
-        Return a display label for a status key.
-        - If Arabic lang => use Arabic mapping (stable)
-        - Else => use selection labels (fallback_labels) or key
-        """
-        # Core tailor.order workflow keys
-        ar = {
-            "draft": "مسودة",
-            "confirmed": "مؤكد",
-            "cutting": "جاهز للقص",
-            "sewing": "الخياطة",
-            "qc": "فحص الجودة",
-            "ready_delivery": "جاهز للتسليم",
-            "delivered": "تم التسليم",
-            "cancel": "ملغي",
-        }
-        if self._is_ar():
-            return ar.get(key, key)
+    def _tailor_productivity(self, df, dt, company_id):
+        # -------------------------
+        # ✅✅✅ ONLY FIXED HERE: Tailor Productivity (FINISHED / COMPLETED MOs)
+        # -------------------------
+        tailor_productivity = []
+        try:
+            MO = self.env["mrp.production"].sudo()
+
+            mo_domain = [("state", "=", "done")]
+            if company_id and "company_id" in MO._fields:
+                mo_domain.append(("company_id", "=", company_id))
 
-        # non-ar: prefer selection label if provided
-        if fallback_labels and key in fallback_labels:
-            return fallback_labels.get(key)
-        return key
+            mo_date_field = self._pick_first_existing_field(
+                MO,
+                ["date_finished", "date_end", "write_date", "create_date"],
+                default="write_date",
+            )
+            mo_domain += self._domain_from_dates(df, dt, mo_date_field)
+
+            # ✅ pick the best available “tailor” field on mrp.production
+            tailor_field = self._pick_first_existing_field(
+                MO,
+                [
+                    "x_assigned_tailor",
+                    "x_tailor_id",
+                    "employee_id",
+                    "user_id",
+                    "responsible_id",
+                ],
+                default=None,
+            )
+
+            if tailor_field:
+                rg = MO.read_group(
+                    mo_domain + [(tailor_field, "!=", False)],
+                    [tailor_field],
+                    [tailor_field],
+                    lazy=False,
+                )
+                for r in rg:
+                    t = r.get(tailor_field)
+                    if t:
+                        label = t[1] if isinstance(t, (list, tuple)) and len(t) > 1 else str(t)
+                        tailor_productivity.append({
+                            "label": label,
+                            "value": r.get("__count") or r.get(f"{tailor_field}_count") or 0,
+                        })
+            else:
+                if "workorder_ids" in MO._fields:
+                    mos = MO.search(mo_domain)
+                    counts = {}
+                    for mo in mos:
+                        for wo in mo.workorder_ids:
+                            emp = False
+                            if "employee_id" in wo._fields:
+                                emp = wo.employee_id
+                            elif "x_assigned_tailor" in wo._fields:
+                                emp = wo.x_assigned_tailor
+                            if emp:
+                                counts[emp.display_name] = counts.get(emp.display_name, 0) + 1
+                    tailor_productivity = [{"label": k, "value": v} for k, v in sorted(counts.items(), key=lambda x: x[1], reverse=True)]
+
+        except Exception as e:
+            _logger.warning("Tailor productivity (MOs) skipped: %s", e)
+
+        return tailor_productivity
+
+    def _stock_alerts(self, company_id, only_fabrics):
+        # -------------------------
+        # Stock Alerts (NEGATIVE AVAILABLE = quantity - reserved)
+        # -------------------------
+        stock_alerts = []
+        stock_alerts_count = 0
+        try:
+            Quant = self.env["stock.quant"].sudo()
+
+            q_domain = [("location_id.usage", "=", "internal")]
+            if company_id and "company_id" in Quant._fields:
+                q_domain.append(("company_id", "=", company_id))
+
+            if only_fabrics:
+                q_domain.append(("product_id.categ_id.name", "ilike", "Fabric"))
+
+            # ✅ negative quants summed per (product, location) in SQL; only the
+            # previewed rows are named (as superuser, like the quants), the total
+            # comes from the window count
+            quant_tbl = Quant._table
+            query = Quant._where_calc(q_domain)
+            self.env.cr.execute(SQL(
+                """
+                SELECT %(product)s, %(location)s,
+                       SUM(%(qty)s - %(reserved)s) AS available,
+                       COUNT(*) OVER () AS total
+                  FROM %(from_clause)s
+                 WHERE %(where_clause)s AND %(qty)s - %(reserved)s < 0
+              GROUP BY %(product)s, %(location)s
+              ORDER BY available
+                 LIMIT 20
+                """,
+                product=SQL.identifier(quant_tbl, "product_id"),
+                location=SQL.identifier(quant_tbl, "location_id"),
+                qty=SQL.identifier(quant_tbl, "quantity"),
+                reserved=SQL.identifier(quant_tbl, "reserved_quantity"),
+                from_clause=query.from_clause,
+                where_clause=query.where_clause,
+            ))
+            rows = self.env.cr.fetchall()
+            stock_alerts_count = rows[0][3] if rows else 0
+
+            products = {
+                r["id"]: r["display_name"]
+                for r in Quant.env["product.product"].browse(list({r[0] for r in rows})).read(["display_name"])
+            }
+            locations = {
+                r["id"]: r["display_name"]
+                for r in Quant.env["stock.location"].browse(list({r[1] for r in rows})).read(["display_name"])
+            }
+            for product_id, location_id, available, _total in rows:
+                available = float(available or 0.0)
+                stock_alerts.append({
+                    "product": products.get(product_id, ""),
+                    "location": locations.get(location_id, ""),
+                    "on_hand": available,
+                    "min_qty": 0.0,
+                    "to_order": abs(available),
+                })
+
+        except (KeyError, ValueError) as e:
+            # stock models / fields missing in this database; access errors are not hidden
+            _logger.warning("Stock alerts (negative available) skipped: %s", e)
+
+        return stock_alerts, stock_alerts_count
+
+    def _empty_kpis_response(self, df, dt, company_id, label, tailor_productivity, stock_alerts, stock_alerts_count):
+        """get_kpis payload when no tailor order matches the filters (same shape, zeroed)."""
+        return {
+            "filters": {
+                "date_from": fields.Date.to_string(df) if df else False,
+                "date_to": fields.Date.to_string(dt) if dt else False,
+                "company_id": company_id or False,
+            },
+            "kpis": {
+                "wip_orders": 0,
+                "cutting_orders": 0,
+                "sewing_orders": 0,
+                "qc_orders": 0,
+                "ready_delivery": 0,
+                "delivered": 0,
+                "bottleneck_stage": label("cutting"),
+                "bottleneck_count": 0,
+                "avg_cycle_days": 0.0,
+                "avg_qc_days": 0.0,
+                "qc_pass_pct": 0.0,
+                "late_orders": 0,
+                "late_fabric_m": 0.0,
+                "late_accessories_qty": 0.0,
+                "delayed_orders": 0,
+                "stock_alerts": stock_alerts_count,
+            },
+            "charts": {
+                "wip_by_month": [],
+                "throughput_by_month": [],
+                "top_tailors_wip": [],
+                "top_tailors_delivered": [],
+                "tailor_productivity": tailor_productivity,
+            },
+            "tables": {
+                "late_orders": [],
+                "delayed_orders": [],
+                "kanban": [
+                    {"key": st, "title": label(st), "count": 0, "cards": []}
+                    for st in WIP_STATES
+                ],
+                "stock_alerts": stock_alerts,
+            },
+        }
 
     # ------------------------------------------------------------
     # Main RPC
@@ -160,25 +414,32 @@ class TailorProductionDashboard(models.AbstractModel):
             domain.append(("company_id", "=", company_id))
         domain += self._domain_from_dates(df, dt, order_date_field)
 
-        orders = TailorOrder.search(domain)
+        status_field = self._resolved_field("tailor.order", ("status",))
+        deadline_field = self._resolved_field("tailor.order", ("date_deadline",))
+
+        # detect the link field on tailor.order that points to a manufacturing order
+        mo_link_field = self._pick_first_existing_field(
+            TailorOrder,
+            ["mrp_id", "production_id", "mrp_production_id"],
+            default=None,
+        )
+
+        # ✅ one GROUP BY status for every counter below (and the total)
+        status_counts = {}
+        if status_field:
+            for r in TailorOrder.read_group(domain, ["id:count"], [status_field], lazy=False):
+                status_counts[r[status_field]] = self._rg_count(r)
+            orders_count = sum(status_counts.values())
+        else:
+            orders_count = TailorOrder.search_count(domain)
 
         _logger.info(
             "[ProductionDashboard] date_field=%s delivered_field=%s df=%s dt=%s company_id=%s -> orders=%s",
-            order_date_field, delivered_date_field, df, dt, company_id, len(orders)
+            order_date_field, delivered_date_field, df, dt, company_id, orders_count
         )
 
-        status_field = "status" if "status" in TailorOrder._fields else None
-
         def _st(o):
-            return getattr(o, status_field) if status_field else False
-
-        cutting = orders.filtered(lambda o: _st(o) == "cutting")
-        sewing = orders.filtered(lambda o: _st(o) == "sewing")
-        qc = orders.filtered(lambda o: _st(o) == "qc")
-        ready_delivery = orders.filtered(lambda o: _st(o) == "ready_delivery")
-        delivered = orders.filtered(lambda o: _st(o) == "delivered")
-
-        wip = orders.filtered(lambda o: _st(o) in ("confirmed", "cutting", "sewing", "qc", "ready_delivery"))
+            return o.get(status_field) if status_field else False
 
         # status labels safe
         status_labels = {}
@@ -188,17 +449,42 @@ class TailorProductionDashboard(models.AbstractModel):
         except Exception:
             status_labels = {}
 
+        # ✅ language resolved once; labels are plain dict lookups afterwards
+        is_ar = self._is_ar()
+
+        def _label(key):
+            if is_ar:
+                return AR_STATUS.get(key, key)
+            return status_labels.get(key, key)
+
+        if not orders_count:
+            # ✅ nothing matches the filters: skip every order query, keep the
+            # order-independent MO productivity and stock alerts
+            stock_alerts, stock_alerts_count = self._stock_alerts(company_id, only_fabrics)
+            return self._empty_kpis_response(
+                df, dt, company_id, _label,
+                tailor_productivity=self._tailor_productivity(df, dt, company_id),
+                stock_alerts=stock_alerts,
+                stock_alerts_count=stock_alerts_count,
+            )
+
+        wip_count = sum(status_counts.get(s, 0) for s in WIP_STATES)
+
+        delivered_count = status_counts.get("delivered", 0)
+        delivered_domain = domain + [(status_field, "=", "delivered")] if status_field else None
+        wip_domain = domain + [(status_field, "in", list(WIP_STATES))] if status_field else None
+
         # Bottleneck stage (✅ improved labels to be Arabic-safe)
         stage_counts = {
-            "cutting": len(cutting),
-            "sewing": len(sewing),
-            "qc": len(qc),
-            "ready_delivery": len(ready_delivery),
+            "cutting": status_counts.get("cutting", 0),
+            "sewing": status_counts.get("sewing", 0),
+            "qc": status_counts.get("qc", 0),
+            "ready_delivery": status_counts.get("ready_delivery", 0),
         }
         bottleneck_key = max(stage_counts, key=stage_counts.get) if stage_counts else "N/A"
         bottleneck_count = stage_counts.get(bottleneck_key, 0)
         bottleneck_stage = (
-            self._status_label(bottleneck_key, fallback_labels=status_labels)
+            _label(bottleneck_key)
             if bottleneck_key != "N/A"
             else "N/A"
         )
@@ -213,62 +499,40 @@ class TailorProductionDashboard(models.AbstractModel):
         try:
             MO = self.env["mrp.production"].sudo()
 
-            # detect the link field on tailor.order that points to a manufacturing order
-            mo_link_field = self._pick_first_existing_field(
-                TailorOrder,
-                ["mrp_id", "production_id", "mrp_production_id"],
-                default=None,
-            )
-
-            mos = MO.browse()
+            # ids come from a many2one column: FK-consistent, no exists() round trip
+            mo_ids = []
             if mo_link_field:
-                mo_ids = orders.mapped(mo_link_field).ids
-                if mo_ids:
-                    mos = MO.browse(mo_ids).exists()
-
-            # Compute cycle from MO dates (done or not)
-            cycle_vals = []
-            if mos:
-                for mo in mos:
-                    # pick best start/end
-                    start = self._to_dt(getattr(mo, "date_start", False)) \
-                        or self._to_dt(getattr(mo, "date_planned_start", False)) \
-                        or self._to_dt(getattr(mo, "create_date", False))
-
-                    end = self._to_dt(getattr(mo, "date_finished", False)) \
-                        or self._to_dt(getattr(mo, "write_date", False))
-
-                    if start and end and end >= start:
-                        cycle_vals.append((end - start).total_seconds() / 86400.0)
-
-                if cycle_vals:
-                    avg_cycle_days = sum(cycle_vals) / len(cycle_vals)
+                linked = TailorOrder.search_read(
+                    domain + [(mo_link_field, "!=", False)], [mo_link_field], load=None
+                )
+                mo_ids = list({r[mo_link_field] for r in linked})
+
+            # Compute cycle from MO dates (done or not), averaged in SQL
+            if mo_ids:
+                avg_cycle_days = self._avg_days_sql(
+                    MO,
+                    [("id", "in", mo_ids)],
+                    ["date_start", "date_planned_start", "create_date"],
+                    ["date_finished", "write_date"],
+                )
 
         except Exception as e:
             _logger.warning("Efficiency (MO cycle) skipped: %s", e)
 
-        # 2) Fallback if MO-based cycle failed
-        if not avg_cycle_days:
-            cycle_days = []
-            for o in delivered:
-                od = self._to_dt(getattr(o, order_date_field, False))
-                dd = self._to_dt(getattr(o, delivered_date_field, False))
-                if od and dd and dd >= od:
-                    cycle_days.append((dd - od).total_seconds() / 86400.0)
-            avg_cycle_days = (sum(cycle_days) / len(cycle_days)) if cycle_days else 0.0
-
-        # 3) QC time: keep your existing logic, but fix types (Date/Datetime safe)
-        qc_vals = []
-        for o in orders:
-            qc_on = self._to_dt(getattr(o, "qc_approved_on", False))
-            od = self._to_dt(getattr(o, order_date_field, False))
-            if qc_on and od and qc_on >= od:
-                qc_vals.append((qc_on - od).total_seconds() / 86400.0)
-        avg_qc_days = (sum(qc_vals) / len(qc_vals)) if qc_vals else 0.0
+        # 2) Fallback if MO-based cycle failed: order date -> delivery, averaged in SQL
+        if not avg_cycle_days and delivered_count:
+            avg_cycle_days = self._avg_days_sql(
+                TailorOrder, delivered_domain, [order_date_field], [delivered_date_field]
+            )
+
+        # 3) QC time: order date -> QC approval, averaged in SQL (Date/Datetime safe)
+        avg_qc_days = self._avg_days_sql(TailorOrder, domain, [order_date_field], ["qc_approved_on"])
 
         # QC pass rate
-        qc_pass = delivered.filtered(lambda o: bool(getattr(o, "qc_approved", False)))
-        qc_pass_pct = (len(qc_pass) / len(delivered) * 100.0) if delivered else 0.0
+        qc_pass_count = 0
+        if delivered_count and "qc_approved" in TailorOrder._fields:
+            qc_pass_count = TailorOrder.search_count(delivered_domain + [("qc_approved", "=", True)])
+        qc_pass_pct = (qc_pass_count / delivered_count * 100.0) if delivered_count else 0.0
 
         # -------------------------
         # Delayed Orders (deadline < today) with fallback to delivery_date
@@ -276,280 +540,190 @@ class TailorProductionDashboard(models.AbstractModel):
         today = fields.Date.today()
 
         def _get_deadline(o):
-            return getattr(o, "date_deadline", False)
+            return o.get(deadline_field) if deadline_field else False
 
         def _get_delivery(o):
-            return getattr(o, "delivery_date", False)
-
-        delayed_orders = orders.filtered(
-            lambda o: _st(o) not in ("delivered", "cancel")
-            and (
-                (_get_deadline(o) and self._date_only(_get_deadline(o)) and self._date_only(_get_deadline(o)) < today)
-                or (not _get_deadline(o) and _get_delivery(o) and self._date_only(_get_delivery(o)) and self._date_only(_get_delivery(o)) < today)
-            )
-        )
+            return o.get("delivery_date")
 
-        delayed_preview = []
+        # ✅ delayed / due-today predicates evaluated by PostgreSQL
+        open_domain = list(domain)
+        if status_field:
+            open_domain.append((status_field, "not in", ("delivered", "cancel")))
 
-        def _sort_delayed(x):
-            return self._date_only(_get_deadline(x)) or self._date_only(_get_delivery(x)) or today
+        # ✅ many2one ids only (load=None): names are resolved in bulk further down
+        preview_fields = ["id", "name", "partner_id", "delivery_date"]
+        if status_field:
+            preview_fields.append(status_field)
+        if deadline_field:
+            preview_fields.append(deadline_field)
 
-        for o in delayed_orders.sorted(_sort_delayed)[:10]:
-            dd = _get_deadline(o)
-            dv = _get_delivery(o)
-            delayed_preview.append({
-                "id": o.id,
-                "name": o.name,
-                "customer": o.partner_id.name if o.partner_id else "",
-                # ✅ Arabic-safe status
-                "status": self._status_label(_st(o), fallback_labels=status_labels),
-                "date_deadline": fields.Date.to_string(self._date_only(dd)) if dd else "",
-                "delivery_date": fields.Date.to_string(self._date_only(dv)) if dv else "",
-                "is_delayed": True,
-            })
+        delayed_domain = open_domain + self._due_domain(TailorOrder, deadline_field, "<", today)
+        delayed_count = TailorOrder.search_count(delayed_domain)
+        delayed_rows = self._due_preview_rows(TailorOrder, delayed_domain, deadline_field, preview_fields) if delayed_count else []
 
         # -------------------------
         # ✅✅ LATE ORDERS (UPDATED):
         # Late Orders = deadline is TODAY (or fallback delivery_date TODAY)
         # status must NOT be delivered/cancel
         # -------------------------
-        def _is_due_today(o):
-            if _st(o) in ("delivered", "cancel"):
-                return False
-
-            dd = self._date_only(_get_deadline(o))
-            if dd:
-                return dd == today
-
-            # fallback if no deadline: use delivery_date == today
-            dv = self._date_only(_get_delivery(o))
-            return bool(dv and dv == today)
-
-        late_orders = orders.filtered(_is_due_today)
+        late_domain = open_domain + self._due_domain(TailorOrder, deadline_field, "=", today)
+        late_count = TailorOrder.search_count(late_domain)
+        late_rows = self._due_preview_rows(TailorOrder, late_domain, deadline_field, preview_fields) if late_count else []
 
         # Fabric + Accessories planned (WIP)
         late_fabric_m = 0.0
-        if wip and "fabric_qty" in TailorOrder._fields:
-            late_fabric_m = sum(wip.mapped("fabric_qty")) or 0.0
+        if wip_count and "fabric_qty" in TailorOrder._fields:
+            rg = TailorOrder.read_group(wip_domain, ["fabric_qty:sum"], [])
+            late_fabric_m = float((rg and rg[0].get("fabric_qty")) or 0.0)
 
         late_accessories_qty = 0.0
-        if "accessory_line_ids" in TailorOrder._fields:
-            for o in wip:
-                for line in o.accessory_line_ids:
-                    late_accessories_qty += float(getattr(line, "quantity", 0.0) or 0.0)
+        if wip_count and "accessory_line_ids" in TailorOrder._fields:
+            # ✅ one SUM(quantity) over the WIP orders' lines (orders as a subquery)
+            AccLine = self.env[TailorOrder._fields["accessory_line_ids"].comodel_name].sudo()
+            inverse = self._pick_first_existing_field(AccLine, ["tailor_order_id", "order_id"])
+            if inverse and "quantity" in AccLine._fields:
+                rg = AccLine.read_group([(inverse, "any", wip_domain)], ["quantity:sum"], [])
+                late_accessories_qty = float((rg and rg[0].get("quantity")) or 0.0)
 
         # -------------------------
         # Kanban Board (✅ improved titles + card status consistency)
         # -------------------------
-        KANBAN_STAGES = ["confirmed", "cutting", "sewing", "qc", "ready_delivery"]
+        KANBAN_STAGES = list(WIP_STATES)
         kanban_columns = []
 
+        # ✅ plain dicts per column
+        card_fields = ["id", "name", "partner_id", "delivery_date"]
+        if "tailor_id" in TailorOrder._fields:
+            card_fields.append("tailor_id")
+        if deadline_field:
+            card_fields.append(deadline_field)
+        if status_field:
+            card_fields.append(status_field)
+
+        kanban_rows = {}
+        for st in KANBAN_STAGES:
+            kanban_rows[st] = []
+            if status_field and status_counts.get(st):
+                kanban_rows[st] = TailorOrder.search_read(
+                    domain + [(status_field, "=", st)], card_fields, limit=50, load=None
+                )
+
+        # ✅ one name read per comodel for every card / preview row
+        all_rows = delayed_rows + late_rows + [r for rows in kanban_rows.values() for r in rows]
+        partner_names = self._names_by_id("res.partner", {r["partner_id"] for r in all_rows})
+        tailor_names = {}
+        if "tailor_id" in card_fields:
+            tailor_names = self._names_by_id(
+                TailorOrder._fields["tailor_id"].comodel_name,
+                {r.get("tailor_id") for r in all_rows},
+            )
+
+        delayed_preview = []
+        for o in delayed_rows:
+            dd = _get_deadline(o)
+            dv = _get_delivery(o)
+            delayed_preview.append({
+                "id": o["id"],
+                "name": o["name"],
+                "customer": partner_names.get(o["partner_id"], ""),
+                # ✅ Arabic-safe status
+                "status": _label(_st(o)),
+                "date_deadline": fields.Date.to_string(self._date_only(dd)) if dd else "",
+                "delivery_date": fields.Date.to_string(self._date_only(dv)) if dv else "",
+                "is_delayed": True,
+            })
+
         for st in KANBAN_STAGES:
-            st_orders = orders.filtered(lambda o, _stg=st: _st(o) == _stg)
             cards = []
-            for o in st_orders[:50]:
-                dd = _get_deadline(o)
-                ddel = getattr(o, "delivery_date", False)
+            for row in kanban_rows[st]:
+                dd = row.get(deadline_field) if deadline_field else False
+                ddel = row.get("delivery_date")
                 delivery_str = ""
                 if ddel:
                     delivery_str = fields.Date.to_string(self._date_only(ddel)) if self._date_only(ddel) else str(ddel)
 
                 cards.append({
-                    "id": o.id,
-                    "name": o.name,
-                    "customer": o.partner_id.name if o.partner_id else "",
-                    "tailor": o.tailor_id.name if getattr(o, "tailor_id", False) else "",
+                    "id": row["id"],
+                    "name": row["name"],
+                    "customer": partner_names.get(row["partner_id"], ""),
+                    "tailor": tailor_names.get(row.get("tailor_id"), ""),
                     "delivery_date": delivery_str,
                     "date_deadline": fields.Date.to_string(self._date_only(dd)) if dd else "",
                     "is_delayed": bool((self._date_only(dd) and self._date_only(dd) < today) or (not dd and self._date_only(ddel) and self._date_only(ddel) < today)),
                     # ✅ (optional) include status label per card (helps UI if needed)
-                    "status": self._status_label(_st(o), fallback_labels=status_labels),
-                    "status_key": _st(o),
+                    "status": _label(st),
+                    "status_key": st,
                 })
             kanban_columns.append({
                 "key": st,
                 # ✅ Arabic-safe column title
-                "title": self._status_label(st, fallback_labels=status_labels),
-                "count": len(st_orders),
+                "title": _label(st),
+                "count": status_counts.get(st, 0),
                 "cards": cards,
             })
 
-        # -------------------------
-        # ✅✅✅ ONLY FIXED HERE: Tailor Productivity (FINISHED / COMPLETED MOs)
-        # -------------------------
-        tailor_productivity = []
-        try:
-            MO = self.env["mrp.production"].sudo()
-
-            mo_domain = [("state", "=", "done")]
-            if company_id and "company_id" in MO._fields:
-                mo_domain.append(("company_id", "=", company_id))
-
-            mo_date_field = self._pick_first_existing_field(
-                MO,
-                ["date_finished", "date_end", "write_date", "create_date"],
-                default="write_date",
-            )
-            mo_domain += self._domain_from_dates(df, dt, mo_date_field)
-
-            # ✅ pick the best available “tailor” field on mrp.production
-            tailor_field = self._pick_first_existing_field(
-                MO,
-                [
-                    "x_assigned_tailor",
-                    "x_tailor_id",
-                    "employee_id",
-                    "user_id",
-                    "responsible_id",
-                ],
-                default=None,
-            )
-
-            if tailor_field:
-                rg = MO.read_group(
-                    mo_domain + [(tailor_field, "!=", False)],
-                    [tailor_field],
-                    [tailor_field],
-                    lazy=False,
-                )
-                for r in rg:
-                    t = r.get(tailor_field)
-                    if t:
-                        label = t[1] if isinstance(t, (list, tuple)) and len(t) > 1 else str(t)
-                        tailor_productivity.append({
-                            "label": label,
-                            "value": r.get("__count") or r.get(f"{tailor_field}_count") or 0,
-                        })
-            else:
-                if "workorder_ids" in MO._fields:
-                    mos = MO.search(mo_domain)
-                    counts = {}
-                    for mo in mos:
-                        for wo in mo.workorder_ids:
-                            emp = False
-                            if "employee_id" in wo._fields:
-                                emp = wo.employee_id
-                            elif "x_assigned_tailor" in wo._fields:
-                                emp = wo.x_assigned_tailor
-                            if emp:
-                                counts[emp.display_name] = counts.get(emp.display_name, 0) + 1
-                    tailor_productivity = [{"label": k, "value": v} for k, v in sorted(counts.items(), key=lambda x: x[1], reverse=True)]
-
-        except Exception as e:
-            _logger.warning("Tailor productivity (MOs) skipped: %s", e)
-
-        # -------------------------
-        # Stock Alerts (NEGATIVE AVAILABLE = quantity - reserved)
-        # -------------------------
-        stock_alerts = []
-        try:
-            Quant = self.env["stock.quant"].sudo()
-
-            q_domain = [("location_id.usage", "=", "internal")]
-            if company_id and "company_id" in Quant._fields:
-                q_domain.append(("company_id", "=", company_id))
-
-            if only_fabrics:
-                q_domain.append(("product_id.categ_id.name", "ilike", "Fabric"))
-
-            quants = Quant.search(q_domain)
-
-            grouped = {}
-            for q in quants:
-                qty = float(q.quantity or 0.0)
-                res = float(getattr(q, "reserved_quantity", 0.0) or 0.0)
-                available = qty - res
-                if available < 0:
-                    key = (q.product_id.id, q.location_id.id)
-                    grouped.setdefault(key, {
-                        "product": q.product_id.display_name,
-                        "location": q.location_id.display_name,
-                        "on_hand": 0.0,
-                        "min_qty": 0.0,
-                        "to_order": 0.0,
-                    })
-                    grouped[key]["on_hand"] += available
-
-            stock_alerts = sorted(grouped.values(), key=lambda x: x["on_hand"])
-            for row in stock_alerts:
-                row["to_order"] = abs(float(row["on_hand"]))
-
-        except Exception as e:
-            _logger.warning("Stock alerts (negative available) skipped: %s", e)
+        tailor_productivity = self._tailor_productivity(df, dt, company_id)
+        stock_alerts, stock_alerts_count = self._stock_alerts(company_id, only_fabrics)
 
         # -------------------------
         # Charts
         # -------------------------
-        wip_trend = TailorOrder.read_group(
-            domain + [(status_field, "in", ["confirmed", "cutting", "sewing", "qc", "ready_delivery"])],
-            ["id:count"],
-            [f"{order_date_field}:month"],
-            lazy=False,
-        )
-        wip_by_month = [
-            {"label": self._safe_month_label(r.get(f"{order_date_field}:month")), "value": self._rg_count(r)}
-            for r in wip_trend
-        ]
-
-        throughput_trend = TailorOrder.read_group(
-            domain + [(status_field, "=", "delivered")],
-            ["id:count"],
-            [f"{delivered_date_field}:month"],
-            lazy=False,
-        )
-        throughput_by_month = [
-            {"label": self._safe_month_label(r.get(f"{delivered_date_field}:month")), "value": self._rg_count(r)}
-            for r in throughput_trend
-        ]
+        wip_by_month = []
+        throughput_by_month = []
+        if status_field:
+            for kind, month, count in self._monthly_wip_and_throughput(
+                    TailorOrder, domain, status_field, order_date_field, delivered_date_field):
+                target = wip_by_month if kind == "wip" else throughput_by_month
+                target.append({"label": self._month_label(month), "value": count})
 
         top_tailors_wip = []
-        if "tailor_id" in TailorOrder._fields:
-            top_tailors_wip_rg = TailorOrder.read_group(
-                domain + [
-                    ("tailor_id", "!=", False),
-                    (status_field, "in", ["confirmed", "cutting", "sewing", "qc", "ready_delivery"]),
-                ],
-                ["tailor_id"],
-                ["tailor_id"],
-                lazy=False,
-            )
-            for r in top_tailors_wip_rg:
-                t = r.get("tailor_id")
-                if t:
-                    top_tailors_wip.append({"label": t[1], "value": r.get("__count") or r.get("tailor_id_count") or 0})
-
         top_tailors_delivered = []
-        if "tailor_id" in TailorOrder._fields:
-            top_tailors_del_rg = TailorOrder.read_group(
-                domain + [("tailor_id", "!=", False), (status_field, "=", "delivered")],
-                ["tailor_id"],
-                ["tailor_id"],
-                lazy=False,
-            )
-            for r in top_tailors_del_rg:
-                t = r.get("tailor_id")
-                if t:
-                    top_tailors_delivered.append({"label": t[1], "value": r.get("__count") or r.get("tailor_id_count") or 0})
+        if "tailor_id" in TailorOrder._fields and status_field:
+            # ✅ both charts from one GROUP BY tailor_id with FILTERed counts
+            query = TailorOrder._where_calc(domain + [("tailor_id", "!=", False)])
+            tailor_col = SQL.identifier(TailorOrder._table, "tailor_id")
+            status_col = SQL.identifier(TailorOrder._table, status_field)
+            self.env.cr.execute(SQL(
+                """
+                SELECT %(tailor)s,
+                       COUNT(*) FILTER (WHERE %(status)s IN %(wip_states)s),
+                       COUNT(*) FILTER (WHERE %(status)s = 'delivered')
+                  FROM %(from_clause)s
+                 WHERE %(where_clause)s
+              GROUP BY %(tailor)s
+                """,
+                tailor=tailor_col,
+                status=status_col,
+                wip_states=tuple(WIP_STATES),
+                from_clause=query.from_clause,
+                where_clause=query.where_clause,
+            ))
+            rows = self.env.cr.fetchall()
+            chart_tailor_names = self._names_by_id(
+                TailorOrder._fields["tailor_id"].comodel_name, {r[0] for r in rows}
+            ) if rows else {}
+
+            for tailor_id, wip_n, delivered_n in sorted(rows, key=lambda r: r[1], reverse=True):
+                if wip_n:
+                    top_tailors_wip.append({"label": chart_tailor_names.get(tailor_id, ""), "value": wip_n})
+            for tailor_id, wip_n, delivered_n in sorted(rows, key=lambda r: r[2], reverse=True):
+                if delivered_n:
+                    top_tailors_delivered.append({"label": chart_tailor_names.get(tailor_id, ""), "value": delivered_n})
 
         # -------------------------
         # Late orders table preview (UPDATED to show deadline/delivery)
         # -------------------------
         late_preview = []
-
-        def _late_sort(o):
-            # show deadline first; fallback to delivery; else today
-            return self._date_only(_get_deadline(o)) or self._date_only(_get_delivery(o)) or today
-
-        for o in late_orders.sorted(_late_sort)[:10]:
+        for o in late_rows:
             dd = _get_deadline(o)
             dv = _get_delivery(o)
 
             late_preview.append({
-                "id": o.id,
-                "name": o.name,
-                "customer": o.partner_id.name if o.partner_id else "",
+                "id": o["id"],
+                "name": o["name"],
+                "customer": partner_names.get(o["partner_id"], ""),
                 # ✅ Arabic-safe status
-                "status": self._status_label(_st(o), fallback_labels=status_labels),
+                "status": _label(_st(o)),
                 "status_key": _st(o),
                 "date_deadline": fields.Date.to_string(self._date_only(dd)) if dd else "",
                 "delivery_date": fields.Date.to_string(self._date_only(dv)) if dv else "",
@@ -562,13 +736,13 @@ class TailorProductionDashboard(models.AbstractModel):
                 "company_id": company_id or False,
             },
             "kpis": {
-                "wip_orders": len(wip),
-                "cutting_orders": len(cutting),
-                "sewing_orders": len(sewing),
-                "qc_orders": len(qc),
+                "wip_orders": wip_count,
+                "cutting_orders": status_counts.get("cutting", 0),
+                "sewing_orders": status_counts.get("sewing", 0),
+                "qc_orders": status_counts.get("qc", 0),
 
-                "ready_delivery": len(ready_delivery),
-                "delivered": len(delivered),
+                "ready_delivery": status_counts.get("ready_delivery", 0),
+                "delivered": delivered_count,
 
                 # ✅ Arabic-safe bottleneck label
                 "bottleneck_stage": bottleneck_stage,
@@ -579,12 +753,12 @@ class TailorProductionDashboard(models.AbstractModel):
 
                 "qc_pass_pct": round(qc_pass_pct, 2),
 
-                "late_orders": len(late_orders),
+                "late_orders": late_count,
                 "late_fabric_m": round(late_fabric_m, 2),
                 "late_accessories_qty": round(late_accessories_qty, 2),
 
-                "delayed_orders": len(delayed_orders),
-                "stock_alerts": len(stock_alerts),
+                "delayed_orders": delayed_count,
+                "stock_alerts": stock_alerts_count,
             },
             "charts": {
                 "wip_by_month": wip_by_month,
@@ -597,6 +771,6 @@ class TailorProductionDashboard(models.AbstractModel):
                 "late_orders": late_preview,
                 "delayed_orders": delayed_preview,
                 "kanban": kanban_columns,
-                "stock_alerts": stock_alerts[:20],
+                "stock_alerts": stock_alerts,
             },
         }
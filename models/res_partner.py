@@ -8,6 +8,7 @@ class ResPartner(models.Model):
         'customer.measurements',
         'partner_id',
         string='Tailor Measurements',
+        order='measurement_date desc, create_date desc, id desc',
     )
 
     def action_open_ai_measure_wizard(self):
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 import logging
+from collections import defaultdict
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.tools.translate import _
 from odoo.exceptions import UserError
+from odoo.tools import SQL
 from odoo.tools.float_utils import float_round, float_compare
 
 _logger = logging.getLogger(__name__)
@@ -32,6 +34,13 @@ class SaleOrder(models.Model):
         readonly=True,
     )
 
+    def init(self):
+        # showroom dashboard filters orders by company and date_order range
+        tools.create_index(
+            self.env.cr, "sale_order_company_date_order_idx", self._table,
+            ["company_id", "date_order"],
+        )
+
     @api.depends("amount_total")
     def _compute_remaining_amount(self):
         """
@@ -54,21 +63,49 @@ class SaleOrder(models.Model):
         readonly=True,
     )
 
-    def _compute_latest_measurement(self):
+    def _latest_measurement_by(self, field_name, ids):
+        """
+        {value: latest customer.measurements id} for ``field_name`` in ``ids``,
+        one DISTINCT ON query over the records the user may read (record rules
+        applied through _search).
+        """
         Measurements = self.env["customer.measurements"]
+        query = Measurements._search([(field_name, "in", ids)])
+        key = SQL.identifier(Measurements._table, field_name)
+        self.env.cr.execute(SQL(
+            """
+            SELECT DISTINCT ON (%(key)s) %(key)s, %(id)s
+              FROM %(from_clause)s
+             WHERE %(where_clause)s
+             ORDER BY %(key)s, %(create_date)s DESC, %(id)s DESC
+            """,
+            key=key,
+            id=SQL.identifier(Measurements._table, "id"),
+            create_date=SQL.identifier(Measurements._table, "create_date"),
+            from_clause=query.from_clause,
+            where_clause=query.where_clause or SQL("TRUE"),
+        ))
+        return dict(self.env.cr.fetchall())
+
+    def _compute_latest_measurement(self):
+        """
+        Latest measurement of the order, falling back to the customer's latest one.
+        ✅ At most two DISTINCT ON queries for the whole recordset.
+        """
+        self.env["customer.measurements"].flush_model(["sale_order_id", "partner_id", "create_date"])
+
+        so_ids = self._origin.ids
+        by_so = self._latest_measurement_by("sale_order_id", so_ids) if so_ids else {}
+
+        partner_ids = list({
+            order.partner_id.id
+            for order in self
+            if order.partner_id and order._origin.id not in by_so
+        })
+        by_partner = self._latest_measurement_by("partner_id", partner_ids) if partner_ids else {}
+
         for order in self:
-            meas = Measurements.search(
-                [("sale_order_id", "=", order.id)],
-                order="create_date desc, id desc",
-                limit=1,
-            )
-            if not meas and order.partner_id:
-                meas = Measurements.search(
-                    [("partner_id", "=", order.partner_id.id)],
-                    order="create_date desc, id desc",
-                    limit=1,
-                )
-            order.latest_measurement_id = meas.id if meas else False
+            order.latest_measurement_id = by_so.get(order._origin.id) or by_partner.get(order.partner_id.id)
 
     # ------------------------------------------------------------
     # Add measurement popup
@@ -94,23 +131,54 @@ class SaleOrder(models.Model):
     # ------------------------------------------------------------
     # ADVANCE PAYMENT INVOICE (Odoo 19)
     # ------------------------------------------------------------
+    _DOWN_PAYMENT_PRODUCT_DOMAIN = [
+        ("name", "=", "Down Payment"),
+        ("sale_ok", "=", True),
+        ("type", "=", "service"),
+    ]
+
+    @api.model
+    @tools.ormcache()
+    def _get_down_payment_product_id(self):
+        # ✅ lookup only: nothing is created inside the cached method
+        product = self.env["product.product"].sudo().search(self._DOWN_PAYMENT_PRODUCT_DOMAIN, limit=1)
+        return product.id or False
+
     def _get_down_payment_product(self):
+        # ✅ product id cached; re-resolve if the cached record is missing or gone
         Product = self.env["product.product"].sudo()
-        product = Product.search([
-            ("name", "=", "Down Payment"),
-            ("sale_ok", "=", True),
-            ("type", "=", "service"),
-        ], limit=1)
-        if product:
-            return product
-
-        return Product.create({
-            "name": "Down Payment",
-            "type": "service",
-            "sale_ok": True,
-            "purchase_ok": False,
-            "invoice_policy": "order",
-        })
+        product = Product.browse(self._get_down_payment_product_id()).exists()
+        if not product:
+            product = Product.search(self._DOWN_PAYMENT_PRODUCT_DOMAIN, limit=1) or Product.create({
+                "name": "Down Payment",
+                "type": "service",
+                "sale_ok": True,
+                "purchase_ok": False,
+                "invoice_policy": "order",
+            })
+            self.env.registry.clear_cache()
+        return product
+
+    def _changed_line_vals(self, line, vals):
+        """
+        Subset of ``vals`` that differs from ``line``'s current values
+        (many2one ids, (6, 0, ids) many2many commands, floats at 6 digits).
+        """
+        changed = {}
+        for fname, value in vals.items():
+            field = line._fields[fname]
+            current = line[fname]
+            if field.type == "many2many":
+                same = set(current.ids) == set(value[0][2])
+            elif field.type == "many2one":
+                same = current.id == value
+            elif field.type in ("float", "monetary"):
+                same = float_compare(current or 0.0, value or 0.0, precision_digits=6) == 0
+            else:
+                same = current == value
+            if not same:
+                changed[fname] = value
+        return changed
 
     def _get_existing_draft_advance_invoice(self):
         self.ensure_one()
@@ -135,6 +203,24 @@ class SaleOrder(models.Model):
         if not taxes:
             return float_round(total_included, precision_digits=6)
 
+        # ✅ closed-form inverse for plain percent taxes (no tax-engine calls)
+        if all(t.amount_type == "percent" for t in taxes):
+            if all(t.price_include for t in taxes):
+                return float_round(total_included, precision_digits=6)
+            if not any(t.price_include for t in taxes):
+                # total = base * factor; taxes flagged include_base_amount raise
+                # the base of the following (base-affected) taxes
+                factor = 1.0
+                base_factor = 1.0
+                for tax in taxes.sorted(lambda t: (t.sequence, t.id)):
+                    amount = (base_factor if tax.is_base_affected else 1.0) * tax.amount / 100.0
+                    factor += amount
+                    if tax.include_base_amount:
+                        base_factor += amount
+                if factor > 0:
+                    return float_round(total_included / factor, precision_digits=6)
+
+        # fixed / division / group / mixed taxes: bisection on compute_all
         def _ti(base):
             res = taxes.compute_all(base, currency=currency, quantity=1.0, product=product, partner=partner)
             return float(res.get("total_included", 0.0))
@@ -155,36 +241,60 @@ class SaleOrder(models.Model):
 
         return float_round(high, precision_digits=6)
 
-    def _ensure_invoice_total_equals_advance(self, invoice):
+    def _advance_rounding_commands(self, got):
         """
-        If invoice total is off by a small rounding amount (0.01),
-        add a rounding adjustment line (no tax) so invoice total becomes exact.
+        Rounding adjustment line (no tax) bringing a total of ``got`` to exactly
+        advance_payment, as invoice_line_ids commands ([] when already equal).
         """
         self.ensure_one()
         currency = self.currency_id
         expected = currency.round(self.advance_payment)
-        got = currency.round(invoice.amount_total)
-
-        if expected == got:
-            return
+        got = currency.round(got)
 
         diff = currency.round(expected - got)
+        if currency.is_zero(diff):
+            return []
         if abs(diff) > (currency.rounding * 5):
             raise UserError(_(
                 "Advance invoice total (%.2f) is too far from Advance Payment (%.2f). "
                 "Check your tax configuration."
             ) % (got, expected))
 
-        invoice.write({
-            "invoice_line_ids": [(0, 0, {
-                "name": _("Rounding Adjustment"),
-                "quantity": 1.0,
-                "price_unit": diff,
-                "tax_ids": [(6, 0, [])],
-            })]
-        })
+        return [(0, 0, {
+            "name": _("Rounding Adjustment"),
+            "quantity": 1.0,
+            "price_unit": diff,
+            "tax_ids": [(6, 0, [])],
+        })]
+
+    def _advance_rounding_line_vals(self, taxes, price_unit, product=None):
+        """
+        Rounding commands for an advance invoice with a single down payment line
+        at ``price_unit`` (see :meth:`_advance_rounding_commands`).
+        """
+        self.ensure_one()
+        if not taxes:
+            return self._advance_rounding_commands(price_unit)
+        res = taxes.compute_all(
+            price_unit, currency=self.currency_id, quantity=1.0, product=product, partner=self.partner_id,
+        )
+        return self._advance_rounding_commands(res.get("total_included", 0.0))
+
+    def _ensure_invoice_total_equals_advance(self, invoice):
+        """
+        If invoice total is off by a small rounding amount (0.01),
+        add a rounding adjustment line (no tax) so invoice total becomes exact.
+        """
+        self.ensure_one()
+        rounding_lines = self._advance_rounding_commands(invoice.amount_total)
+        if not rounding_lines:
+            return
+
+        invoice.write({"invoice_line_ids": rounding_lines})
         invoice._compute_amount()
 
+        currency = self.currency_id
+        expected = currency.round(self.advance_payment)
         got2 = currency.round(invoice.amount_total)
         if got2 != expected:
             raise UserError(_(
@@ -213,11 +323,14 @@ class SaleOrder(models.Model):
         # taxes from product mapped by fiscal position
         taxes = down_payment_product.taxes_id.filtered(lambda t: t.company_id == self.company_id and t.active)
         if self.fiscal_position_id:
-            taxes = self.fiscal_position_id.map_tax(taxes, down_payment_product, self.partner_shipping_id)
-        taxes = taxes.browse(list(set(taxes.ids)))
+            taxes = self.fiscal_position_id.map_tax(taxes)
 
         # compute POSITIVE invoice price_unit so total incl tax ~ advance_payment
-        if taxes and all(t.price_include for t in taxes):
+        # ✅ no taxes / tax-included taxes: the line total IS the price, nothing to round
+        needs_rounding_check = bool(taxes) and not all(t.price_include for t in taxes)
+        if not taxes:
+            invoice_price_unit = self.currency_id.round(self.advance_payment)
+        elif not needs_rounding_check:
             invoice_price_unit = float_round(self.advance_payment, precision_digits=6)
         else:
             invoice_price_unit = self._compute_base_from_total_included(
@@ -240,12 +353,15 @@ class SaleOrder(models.Model):
         dp_lines = self.order_line.filtered(lambda l: l.is_downpayment and l.product_id == down_payment_product)
         if dp_lines:
             dp_line = dp_lines[-1]
-            dp_line.write({
+            # ✅ only write what changed (repeated clicks leave the line untouched)
+            dp_vals = self._changed_line_vals(dp_line, {
                 "name": _("Advance Payment for %s") % self.name,
                 "product_uom_qty": so_qty,           # ✅ NEGATIVE QTY
                 "price_unit": so_price_unit,         # ✅ POSITIVE PRICE
                 "tax_ids": [(6, 0, taxes.ids)],
             })
+            if dp_vals:
+                dp_line.write(dp_vals)
             extras = dp_lines[:-1]
             if extras:
                 extras.unlink()
@@ -268,7 +384,7 @@ class SaleOrder(models.Model):
         if existing:
             inv_line = existing.invoice_line_ids[:1]
             if inv_line:
-                inv_line.write({
+                inv_vals = self._changed_line_vals(inv_line, {
                     "name": dp_line.name,
                     "product_id": down_payment_product.id,
                     "quantity": 1.0,
@@ -277,6 +393,8 @@ class SaleOrder(models.Model):
                     "tax_ids": [(6, 0, taxes.ids)],
                     "sale_line_ids": [(6, 0, [dp_line.id])],
                 })
+                if inv_vals:
+                    inv_line.write(inv_vals)
             else:
                 existing.write({
                     "invoice_line_ids": [(0, 0, {
@@ -289,8 +407,10 @@ class SaleOrder(models.Model):
                         "sale_line_ids": [(6, 0, [dp_line.id])],
                     })]
                 })
-            existing._compute_amount()
-            self._ensure_invoice_total_equals_advance(existing)
+            # a leftover line (e.g. an earlier rounding adjustment) still needs the check
+            if needs_rounding_check or len(existing.invoice_line_ids) > 1:
+                existing._compute_amount()
+                self._ensure_invoice_total_equals_advance(existing)
 
             return {
                 "type": "ir.actions.act_window",
@@ -300,6 +420,11 @@ class SaleOrder(models.Model):
                 "res_id": existing.id,
             }
 
+        # ✅ rounding line (if any) computed up front: the invoice is created balanced
+        rounding_lines = []
+        if needs_rounding_check:
+            rounding_lines = self._advance_rounding_line_vals(taxes, invoice_price_unit, down_payment_product)
+
         Move = self.env["account.move"]
         invoice = Move.create({
             "move_type": "out_invoice",
@@ -319,11 +444,12 @@ class SaleOrder(models.Model):
                     "tax_ids": [(6, 0, taxes.ids)],
                     "sale_line_ids": [(6, 0, [dp_line.id])],
                 })
-            ],
+            ] + rounding_lines,
         })
 
-        invoice._compute_amount()
-        self._ensure_invoice_total_equals_advance(invoice)
+        # the move's own tax rounding can still differ from compute_all(): verify the result
+        if needs_rounding_check:
+            self._ensure_invoice_total_equals_advance(invoice)
 
         self.message_post(body=_("Advance Payment Invoice created: %s") % (invoice.name or invoice.display_name))
 
@@ -343,17 +469,28 @@ class SaleOrder(models.Model):
 
         sync_keys = {"partner_id", "delivery_date", "advance_payment"}
         if sync_keys.intersection(vals.keys()):
-            TailorOrder = self.env["tailor.order"]
+            # ✅ one search for the whole batch; first tailor order per SO as before
+            tailor_by_so = {}
+            for to in self.env["tailor.order"].search([("sale_order_id", "in", self.ids)]):
+                tailor_by_so.setdefault(to.sale_order_id.id, to)
+
+            # ✅ one write per distinct set of values
+            buckets = defaultdict(list)
             for so in self:
-                to = TailorOrder.search([("sale_order_id", "=", so.id)], limit=1)
-                if to:
-                    update_vals = {}
-                    if "partner_id" in vals:
-                        update_vals["partner_id"] = so.partner_id.id
-                    if "delivery_date" in vals:
-                        update_vals["delivery_date"] = so.delivery_date
-                    if "advance_payment" in vals:
-                        update_vals["advance_payment_input"] = so.advance_payment or 0.0
-                    to.sudo().write(update_vals)
+                to = tailor_by_so.get(so.id)
+                if not to:
+                    continue
+                update_vals = []
+                if "partner_id" in vals:
+                    update_vals.append(("partner_id", so.partner_id.id))
+                if "delivery_date" in vals:
+                    update_vals.append(("delivery_date", so.delivery_date))
+                if "advance_payment" in vals:
+                    update_vals.append(("advance_payment_input", so.advance_payment or 0.0))
+                buckets[tuple(update_vals)].append(to.id)
+
+            TailorOrder = self.env["tailor.order"].sudo()
+            for update_vals, to_ids in buckets.items():
+                TailorOrder.browse(to_ids).write(dict(update_vals))
 
         return res
@@ -1,12 +1,23 @@
 # -*- coding: utf-8 -*-
 import logging
 from datetime import datetime, date, timedelta
+from types import MappingProxyType
 
 from odoo import api, fields, models
 from odoo.tools import float_round
 
 _logger = logging.getLogger(__name__)
 
+# ✅ status labels mapping (EN/AR)
+STATUS_LABELS = MappingProxyType({
+    "draft": ("Draft", "مسودة"),
+    "quotation": ("Quotation", "عرض سعر"),
+    "confirmed": ("Confirmed", "مؤكد"),
+    "ready_delivery": ("Ready for Delivery", "جاهز للتسليم"),
+    "delivered": ("Delivered", "تم التسليم"),
+    "cancelled": ("Cancelled", "ملغي"),
+})
+
 
 class TailorShowroomDashboard(models.AbstractModel):
     _name = "tailor.showroom.dashboard"
@@ -36,15 +47,21 @@ class TailorShowroomDashboard(models.AbstractModel):
 
         return str(month_val)
 
+    def _date_bounds(self, date_from, date_to):
+        """(start, end) datetimes covering whole days; None for a missing side."""
+        df = fields.Date.to_date(date_from) if date_from else None
+        dt = fields.Date.to_date(date_to) if date_to else None
+        start = fields.Datetime.to_datetime(df) if df else None
+        end = fields.Datetime.to_datetime(dt) + timedelta(days=1, seconds=-1) if dt else None
+        return start, end
+
     def _range_domain(self, date_from, date_to, field_name="date_order"):
         dom = []
-        df = fields.Date.from_string(date_from) if date_from else False
-        dt = fields.Date.from_string(date_to) if date_to else False
-        if df:
-            dom.append((field_name, ">=", fields.Datetime.to_datetime(df)))
-        if dt:
-            end_dt = fields.Datetime.to_datetime(dt) + timedelta(days=1) - timedelta(seconds=1)
-            dom.append((field_name, "<=", end_dt))
+        start, end = self._date_bounds(date_from, date_to)
+        if start:
+            dom.append((field_name, ">=", start))
+        if end:
+            dom.append((field_name, "<=", end))
         return dom
 
     # ------------------------------------------------------------
@@ -59,84 +76,89 @@ class TailorShowroomDashboard(models.AbstractModel):
         # ✅ ADDED: detect Arabic language for dashboard labels
         is_ar = (self.env.context.get("lang") or self.env.user.lang or "").startswith("ar")
 
-        # ✅ ADDED: status labels mapping (EN/AR)
-        STATUS_LABELS = {
-            "draft": ("Draft", "مسودة"),
-            "quotation": ("Quotation", "عرض سعر"),
-            "confirmed": ("Confirmed", "مؤكد"),
-            "ready_delivery": ("Ready for Delivery", "جاهز للتسليم"),
-            "delivered": ("Delivered", "تم التسليم"),
-            "cancelled": ("Cancelled", "ملغي"),
-        }
-
-        def _label(key):
-            en, ar = STATUS_LABELS[key]
-            return ar if is_ar else en
+        # ✅ ADDED: status labels (EN/AR) resolved once for the request language
+        labels = {key: (ar if is_ar else en) for key, (en, ar) in STATUS_LABELS.items()}
 
         # Domain for sales orders
         so_domain = self._range_domain(date_from, date_to, "date_order")
         if company_id:
             so_domain.append(("company_id", "=", int(company_id)))
 
-        sale_orders = SaleOrder.search(so_domain)
-        total_orders = len(sale_orders)
-
-        # KPIs by state
-        pending_quotations = SaleOrder.search_count(so_domain + [("state", "in", ("draft", "sent"))])
-        confirmed_set = sale_orders.filtered(lambda o: o.state in ("sale", "done"))
-        confirmed_orders = len(confirmed_set)
-        cancelled_orders = SaleOrder.search_count(so_domain + [("state", "=", "cancel")])
-
-        # Delivery KPIs (pickings)
-        delivered_orders = SaleOrder.search_count(so_domain + [("picking_ids.state", "=", "done")])
-        ready_delivery_orders = SaleOrder.search_count(so_domain + [("picking_ids.state", "=", "assigned")])
+        # ✅ KPIs by state: one grouped count instead of a search_count per state
+        state_counts = {
+            r["state"]: r["__count"]
+            for r in SaleOrder.read_group(so_domain, ["state"], ["state"], lazy=False)
+        }
+        total_orders = sum(state_counts.values())
+        # ✅ ids only, fetched once and reused below
+        so_ids = SaleOrder.search(so_domain).ids if total_orders else []
+        draft_orders = state_counts.get("draft", 0)
+        pending_quotations = draft_orders + state_counts.get("sent", 0)
+        confirmed_orders = state_counts.get("sale", 0) + state_counts.get("done", 0)
+        confirmed_domain = so_domain + [("state", "in", ("sale", "done"))]
+        confirmed_ids = SaleOrder.search(confirmed_domain).ids if confirmed_orders else []
+        cancelled_orders = state_counts.get("cancel", 0)
+
+        # Delivery KPIs (pickings): distinct orders per picking state, one query
+        picking_counts = {}
+        if so_ids:
+            picking_counts = {
+                r["state"]: r["sale_id"]
+                for r in self.env["stock.picking"].sudo().read_group(
+                    [("sale_id", "in", so_ids), ("state", "in", ("done", "assigned"))],
+                    ["sale_id:count_distinct"],
+                    ["state"],
+                    lazy=False,
+                )
+            }
+        delivered_orders = picking_counts.get("done", 0)
+        ready_delivery_orders = picking_counts.get("assigned", 0)
 
         # Today KPI
         today = fields.Date.context_today(self)
-        today_start = fields.Datetime.to_datetime(today)
-        today_end = today_start + timedelta(days=1) - timedelta(seconds=1)
+        today_start, today_end = self._date_bounds(today, today)
         today_domain = [("date_order", ">=", today_start), ("date_order", "<=", today_end)]
         if company_id:
             today_domain.append(("company_id", "=", int(company_id)))
         new_orders_today = SaleOrder.search_count(today_domain)
 
         # Conversion
-        total_quotations = SaleOrder.search_count(
-            so_domain + [("state", "in", ("draft", "sent", "sale", "done"))]
-        )
+        total_quotations = pending_quotations + confirmed_orders
         showroom_conversion_rate = (confirmed_orders / total_quotations * 100.0) if total_quotations else 0.0
 
-        # Revenue (confirmed orders)
-        total_revenue = sum(o.amount_total for o in confirmed_set)
-        total_vat = sum((o.amount_tax or 0.0) for o in confirmed_set)
+        # Revenue (confirmed orders), summed by PostgreSQL
+        total_revenue = total_vat = 0.0
+        if confirmed_orders:
+            rev_rg = SaleOrder.read_group(confirmed_domain, ["amount_total:sum", "amount_tax:sum"], [])[0]
+            total_revenue = rev_rg.get("amount_total") or 0.0
+            total_vat = rev_rg.get("amount_tax") or 0.0
         avg_order_value = (total_revenue / confirmed_orders) if confirmed_orders else 0.0
 
         # Balance Due (posted invoices residual linked to confirmed orders)
         total_balance_due = 0.0
-        try:
-            invs = confirmed_set.mapped("invoice_ids").filtered(
-                lambda m: m.state == "posted" and m.move_type in ("out_invoice", "out_refund")
+        if confirmed_ids:
+            inv_rg = self.env["account.move"].sudo().read_group(
+                [
+                    ("move_type", "in", ("out_invoice", "out_refund")),
+                    ("state", "=", "posted"),
+                    ("line_ids.sale_line_ids.order_id", "in", confirmed_ids),
+                ],
+                ["amount_residual:sum"],
+                ["move_type"],
+                lazy=False,
             )
-            for inv in invs:
-                if inv.move_type == "out_invoice":
-                    total_balance_due += (inv.amount_residual or 0.0)
-                else:
-                    total_balance_due -= (inv.amount_residual or 0.0)
-        except Exception:
-            total_balance_due = 0.0
+            for r in inv_rg:
+                residual = r.get("amount_residual") or 0.0
+                total_balance_due += residual if r["move_type"] == "out_invoice" else -residual
 
         # Missing docs
-        missing_docs = 0
-        try:
-            if "sale_order_id" in CustomerDocs._fields and sale_orders:
-                missing_docs = CustomerDocs.search_count([
-                    ("sale_order_id", "in", sale_orders.ids),
-                    ("is_missing", "=", True),
-                ])
-            else:
-                missing_docs = CustomerDocs.search_count([("is_missing", "=", True)])
-        except Exception:
-            missing_docs = 0
+        if "sale_order_id" in CustomerDocs._fields and so_ids:
+            missing_docs = CustomerDocs.search_count([
+                ("sale_order_id", "in", so_ids),
+                ("is_missing", "=", True),
+            ])
+        else:
+            missing_docs = CustomerDocs.search_count([("is_missing", "=", True)])
 
         on_time_pct = 0.0
 
@@ -144,94 +166,69 @@ class TailorShowroomDashboard(models.AbstractModel):
         # Charts
         # -----------------------------
 
-        # ✅ Sales performance by salesperson (confirmed) — reliable Python aggregation
-        sales_map = {}
-        for o in confirmed_set:
-            key = o.user_id.id if o.user_id else 0
-            label = o.user_id.name if o.user_id else "Unknown"
-            sales_map.setdefault(key, {"label": label, "value": 0.0})
-            sales_map[key]["value"] += (o.amount_total or 0.0)
-
-        sales_performance = [
-            {"label": v["label"], "value": float_round(v["value"], 2)}
-            for v in sales_map.values()
-        ]
+        # ✅ Sales performance by salesperson (confirmed), summed per user by PostgreSQL;
+        # user_id comes back as (id, name) so no res.users records are loaded
+        sales_performance = []
+        if confirmed_orders:
+            sales_performance = [
+                {
+                    "label": r["user_id"][1] if r.get("user_id") else "Unknown",
+                    "value": float_round(r.get("amount_total") or 0.0, 2),
+                }
+                for r in SaleOrder.read_group(
+                    confirmed_domain, ["amount_total:sum"], ["user_id"], lazy=False,
+                )
+            ]
         sales_performance.sort(key=lambda x: x["value"], reverse=True)
 
         # ✅ Orders by status (UPDATED to Arabic/English automatically)
         orders_by_status = [
-            {
-                "key": "draft",
-                "label": _label("draft"),
-                "value": SaleOrder.search_count(so_domain + [("state", "=", "draft")]),
-            },
-            {
-                "key": "quotation",
-                "label": _label("quotation"),
-                "value": pending_quotations,
-            },
-            {
-                "key": "confirmed",
-                "label": _label("confirmed"),
-                "value": confirmed_orders,
-            },
-            {
-                "key": "ready_delivery",
-                "label": _label("ready_delivery"),
-                "value": ready_delivery_orders,
-            },
-            {
-                "key": "delivered",
-                "label": _label("delivered"),
-                "value": delivered_orders,
-            },
-            {
-                "key": "cancelled",
-                "label": _label("cancelled"),
-                "value": cancelled_orders,
-            },
+            {"key": key, "label": labels[key], "value": value}
+            for key, value in (
+                ("draft", draft_orders),
+                ("quotation", pending_quotations),
+                ("confirmed", confirmed_orders),
+                ("ready_delivery", ready_delivery_orders),
+                ("delivered", delivered_orders),
+                ("cancelled", cancelled_orders),
+            )
         ]
 
-        # ✅ Orders trend by month (works across Odoo versions)
-        orders_by_month = []
+        # ✅ Orders trend + revenue trend by month (ORDER-BASED) from one grouped query:
+        # counts over every state, revenue over confirmed states only
+        count_by_month = {}
+        revenue_map = {}
         rg_mo = SaleOrder.read_group(
             so_domain,
-            ["id:count"],
-            ["date_order:month"],
+            ["amount_total:sum"],
+            ["date_order:month", "state"],
             lazy=False,
         )
         for r in rg_mo:
-            count_val = r.get("id_count", r.get("__count", 0))
-            orders_by_month.append({
-                "label": self._safe_month_label(r.get("date_order:month")),
-                "value": count_val,
-            })
-
-        # ✅ Revenue trend by month (ORDER-BASED) — Option 1
-        rev_map = {}
-        for o in confirmed_set:
-            if not o.date_order:
-                continue
-            dt = fields.Datetime.to_datetime(o.date_order)
-            key = (dt.year, dt.month)
-            rev_map[key] = rev_map.get(key, 0.0) + (o.amount_total or 0.0)
-
-        revenue_by_month = []
-        for (yy, mm) in sorted(rev_map.keys()):
-            month_date = date(yy, mm, 1)
-            revenue_by_month.append({
-                "label": month_date.strftime("%B %Y"),
-                "value": float_round(rev_map[(yy, mm)], 2),
-            })
+            month = r.get("date_order:month")
+            count_by_month[month] = count_by_month.get(month, 0) + r.get("__count", 0)
+            if month and r.get("state") in ("sale", "done"):
+                revenue_map[month] = revenue_map.get(month, 0.0) + (r.get("amount_total") or 0.0)
+
+        # each month labelled once, shared by both charts
+        month_labels = {month: self._safe_month_label(month) for month in count_by_month}
+        orders_by_month = [
+            {"label": month_labels[month], "value": count_val}
+            for month, count_val in count_by_month.items()
+        ]
+        revenue_by_month = [
+            {"label": month_labels[month], "value": float_round(amount, 2)}
+            for month, amount in revenue_map.items()
+        ]
 
         # ✅ Top Models (Qty) — Product-based (FIXED WITHOUT CHANGING ANYTHING ELSE)
         top_models = []
 
         # 1) Prefer confirmed orders; if none, fall back to all sale_orders so chart isn't blank
-        base_orders = confirmed_set if confirmed_set else sale_orders
+        base_order_ids = confirmed_ids or so_ids
 
-        if base_orders:
-            line_domain = [("order_id", "in", base_orders.ids)]
+        if base_order_ids:
+            line_domain = [("order_id", "in", base_order_ids)]
 
             # exclude section/note lines if field exists
             if "display_type" in SaleLine._fields:
@@ -243,10 +240,13 @@ class TailorShowroomDashboard(models.AbstractModel):
             # IMPORTANT: must have product_id for Top Models
             line_domain.append(("product_id", "!=", False))
 
+            # ✅ top 10 by quantity sorted and limited by PostgreSQL
             rg_models = SaleLine.read_group(
                 line_domain,
                 ["product_uom_qty:sum"],
                 ["product_id"],
+                orderby="product_uom_qty desc",
+                limit=10,
                 lazy=False,
             )
 
@@ -266,8 +266,6 @@ class TailorShowroomDashboard(models.AbstractModel):
                 x["_qty_sum"] = qty_sum
                 cleaned.append(x)
 
-            cleaned = sorted(cleaned, key=lambda x: x.get("_qty_sum", 0.0), reverse=True)[:10]
-
             for r in cleaned:
                 name = r["product_id"][1]
                 qty = float_round(r.get("_qty_sum", 0.0) or 0.0, 2)
@@ -82,6 +82,13 @@ class TailorVATReport(models.Model):
     amount_total = fields.Monetary(currency_field="currency_id", readonly=True)
 
     def init(self):
+        # ✅ posted customer invoices/refunds only, by company and date
+        tools.create_index(
+            self.env.cr, "account_move_tailor_vat_idx", "account_move",
+            ["company_id", "invoice_date"],
+            where="move_type IN ('out_invoice', 'out_refund') AND state = 'posted'",
+        )
+
         # ✅ IMPORTANT: drop first to avoid "cannot drop columns from view"
         tools.drop_view_if_exists(self.env.cr, self._table)
 
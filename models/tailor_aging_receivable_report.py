@@ -44,12 +44,27 @@ class TailorAgingReceivableReport(models.Model):
     b90p = fields.Monetary(currency_field="currency_id", readonly=True)
 
     def init(self):
+        # ✅ open customer invoices only: the view reads this small slice of account_move
+        tools.create_index(
+            self.env.cr, "account_move_tailor_aging_idx", "account_move",
+            ["partner_id", "invoice_date_due"],
+            where="move_type IN ('out_invoice', 'out_refund') AND state = 'posted'"
+                  " AND COALESCE(amount_residual, 0.0) > 0",
+        )
+
         # ✅ IMPORTANT: drop first to avoid "cannot drop columns from view"
         tools.drop_view_if_exists(self.env.cr, self._table)
 
         self.env.cr.execute(f"""
             CREATE VIEW {self._table} AS (
-                WITH inv AS (
+                WITH asof AS (
+                    -- ✅ bucket boundaries computed once per query, not per invoice
+                    SELECT CURRENT_DATE AS today,
+                           CURRENT_DATE - 30 AS d30,
+                           CURRENT_DATE - 60 AS d60,
+                           CURRENT_DATE - 90 AS d90
+                ),
+                aged AS (
                     SELECT
                         am.id,
                         am.name AS invoice_name,
@@ -61,19 +76,17 @@ class TailorAgingReceivableReport(models.Model):
                         am.currency_id,
                         COALESCE(am.amount_total, 0.0) AS amount_total,
                         COALESCE(am.amount_residual, 0.0) AS amount_residual,
+                        GREATEST(COALESCE(asof.today - am.invoice_date_due, 0), 0) AS days_overdue_calc,
+                        -- ✅ plain date comparisons against the precomputed boundaries
                         CASE
-                            WHEN am.invoice_date_due IS NULL THEN 0
-                            ELSE GREATEST((CURRENT_DATE - am.invoice_date_due), 0)
-                        END AS days_overdue_calc,
-                        CASE
-                            WHEN am.invoice_date_due IS NULL THEN 'not_due'
-                            WHEN am.invoice_date_due > CURRENT_DATE THEN 'not_due'
-                            WHEN (CURRENT_DATE - am.invoice_date_due) BETWEEN 0 AND 30 THEN 'b0_30'
-                            WHEN (CURRENT_DATE - am.invoice_date_due) BETWEEN 31 AND 60 THEN 'b31_60'
-                            WHEN (CURRENT_DATE - am.invoice_date_due) BETWEEN 61 AND 90 THEN 'b61_90'
+                            WHEN am.invoice_date_due IS NULL OR am.invoice_date_due > asof.today THEN 'not_due'
+                            WHEN am.invoice_date_due >= asof.d30 THEN 'b0_30'
+                            WHEN am.invoice_date_due >= asof.d60 THEN 'b31_60'
+                            WHEN am.invoice_date_due >= asof.d90 THEN 'b61_90'
                             ELSE 'b90p'
                         END AS bucket_calc
                     FROM account_move am
+                    CROSS JOIN asof
                     LEFT JOIN res_partner rp ON rp.id = am.partner_id
                     WHERE am.move_type IN ('out_invoice', 'out_refund')
                       AND am.state = 'posted'
@@ -99,6 +112,6 @@ class TailorAgingReceivableReport(models.Model):
                     CASE WHEN bucket_calc = 'b31_60' THEN amount_residual ELSE 0.0 END AS b31_60,
                     CASE WHEN bucket_calc = 'b61_90' THEN amount_residual ELSE 0.0 END AS b61_90,
                     CASE WHEN bucket_calc = 'b90p'   THEN amount_residual ELSE 0.0 END AS b90p
-                FROM inv
+                FROM aged
             )
         """)
@@ -1,349 +1,223 @@
 # -*- coding: utf-8 -*-
 from collections import defaultdict
-from datetime import timedelta
+from types import MappingProxyType
 
-from odoo import models, api, fields
+from odoo import models, api, tools
+from odoo.tools import SQL
+from odoo.tools.misc import format_date
+
+from .production_dashboard import month_trunc_sql
+
+ACTIVE_STATUSES = ("confirmed", "cutting", "sewing", "qc", "ready_delivery")
 
 
 class TailorExecutiveDashboard(models.AbstractModel):
     _name = "tailor.executive.dashboard"
     _description = "Tailor Executive Dashboard (KPIs)"
 
-    # ✅ ADDED: accept tailor_id/status/range (so RPC won't crash)
-    @api.model
-    def get_kpis(self, date_from=False, date_to=False, company_id=False, tailor_id=False, status=False, range=False):
-        domain = []
-        dom_docs = []
-        dom_sale = []
-
-
-
-        if company_id:
-            domain += [("company_id", "=", int(company_id))]
-            dom_sale += [("company_id", "=", int(company_id))]
-
-        if date_from:
-            domain += [("order_date", ">=", date_from)]
-            dom_docs += [("create_date", ">=", date_from)]
-            dom_sale += [("date_order", ">=", date_from)]
-
-        if date_to:
-            domain += [("order_date", "<=", date_to + " 23:59:59")]
-            dom_docs += [("create_date", "<=", date_to + " 23:59:59")]
-            dom_sale += [("date_order", "<=", date_to + " 23:59:59")]
-
-        # ✅ ADDED: Tailor filter (affects orders + docs + revenue through sale_ids)
-        if tailor_id:
-            domain += [("tailor_id", "=", int(tailor_id))]
-
-        # ✅ ADDED: Status filter (optional)
-        # Important: this will narrow "orders" list, so "active/delivered/etc" become within that status.
-        # If you want status dropdown to affect only charts but not "Active Orders", tell me and I adjust.
-        if status:
-            domain += [("status", "=", status)]
-        lang = self.env.context.get("lang") or self.env.user.lang or "ar_001"
-
-        TailorOrder = self.env["tailor.order"].sudo().with_context(lang=lang)
-        Docs = self.env["customer.documents"].sudo().with_context(lang=lang)
-        Sale = self.env["sale.order"].sudo().with_context(lang=lang)
-
-        orders = TailorOrder.search(domain)
-
-        total_orders = len(orders)
-        delivered = orders.filtered(lambda o: o.status == "delivered")
-        cancelled = orders.filtered(lambda o: o.status == "cancel")
-
-        active = orders.filtered(lambda o: o.status in (
-            "confirmed", "cutting", "sewing", "qc", "ready_delivery",
-        ))
-
-        qc = orders.filtered(lambda o: o.status == "qc")
-        ready_delivery = orders.filtered(lambda o: o.status == "ready_delivery")
-
-        # On-time delivery %
-        on_time_count = 0
-        for o in delivered:
-            if o.delivery_date and o.status_changed_on and o.status_changed_on <= o.delivery_date:
-                on_time_count += 1
-        on_time_pct = (on_time_count / len(delivered) * 100.0) if delivered else 0.0
-
-        # Avg lead time days
-        lead_days = []
-        for o in delivered:
-            if o.order_date and o.status_changed_on:
-                delta = o.status_changed_on - o.order_date
-                lead_days.append(delta.total_seconds() / 86400.0)
-        avg_lead_days = (sum(lead_days) / len(lead_days)) if lead_days else 0.0
-
-        # Sale Orders revenue
-        sale_ids = orders.mapped("sale_order_id").ids
-        sale_domain = [("id", "in", sale_ids)] + dom_sale if sale_ids else [("id", "=", 0)]
-        sale_recs = Sale.search(sale_domain)
-        total_revenue = sum(sale_recs.mapped("amount_total")) if sale_recs else 0.0
-
-        # -------------------------------------------------
-        # ✅ SHOWROOM KPIs (Sale Order based)
-        # -------------------------------------------------
-        today = fields.Date.context_today(self)
-        today_start = fields.Datetime.to_datetime(today)
-        today_end = today_start + timedelta(days=1) - timedelta(seconds=1)
-
-        # New Orders Today (Sale Orders)
-        new_orders_today = Sale.search_count(dom_sale + [
-            ("date_order", ">=", today_start),
-            ("date_order", "<=", today_end),
-        ])
-
-        # Pending Quotations (draft + sent)
-        pending_quotations = Sale.search_count(dom_sale + [
-            ("state", "in", ("draft", "sent")),
+    def _order_kpis(self, domain):
+        """
+        Scalar tailor.order KPIs over ``domain`` (status counts, on-time / lead time,
+        QC pass and money / fabric totals), aggregated by PostgreSQL in one query.
+        """
+        TailorOrder = self.env["tailor.order"].sudo()
+        TailorOrder.flush_model([
+            "status", "order_date", "delivery_date", "status_changed_on", "qc_approved",
+            "vat_amount", "balance", "fabric_qty", "fabric_total_cost",
         ])
+        query = TailorOrder._where_calc(domain)
+        self.env.cr.execute(SQL(
+            """
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE %(t)s.status IN %(active)s) AS active,
+                   COUNT(*) FILTER (WHERE %(t)s.status = 'delivered') AS delivered,
+                   COUNT(*) FILTER (WHERE %(t)s.status = 'cancel') AS cancelled,
+                   COUNT(*) FILTER (WHERE %(t)s.status = 'qc') AS qc,
+                   COUNT(*) FILTER (WHERE %(t)s.status = 'ready_delivery') AS ready_delivery,
+                   COUNT(*) FILTER (
+                       WHERE %(t)s.status = 'delivered'
+                         AND %(t)s.status_changed_on <= %(t)s.delivery_date
+                   ) AS on_time,
+                   COUNT(*) FILTER (
+                       WHERE %(t)s.status = 'delivered' AND %(t)s.qc_approved IS TRUE
+                   ) AS qc_pass,
+                   AVG(EXTRACT(EPOCH FROM %(t)s.status_changed_on - %(t)s.order_date) / 86400.0)
+                       FILTER (WHERE %(t)s.status = 'delivered') AS avg_lead_days,
+                   COALESCE(SUM(%(t)s.vat_amount), 0.0) AS vat,
+                   COALESCE(SUM(%(t)s.balance), 0.0) AS balance,
+                   COALESCE(SUM(%(t)s.fabric_qty), 0.0) AS fabric_qty,
+                   COALESCE(SUM(%(t)s.fabric_total_cost), 0.0) AS fabric_cost
+              FROM %(from_clause)s
+             WHERE %(where_clause)s
+            """,
+            t=SQL.identifier(TailorOrder._table),
+            active=ACTIVE_STATUSES,
+            from_clause=query.from_clause,
+            where_clause=query.where_clause or SQL("TRUE"),
+        ))
+        row = self.env.cr.dictfetchone()
+        delivered = row["delivered"]
+        row["on_time_pct"] = (row["on_time"] / delivered * 100.0) if delivered else 0.0
+        row["qc_pass_rate"] = (row["qc_pass"] / delivered * 100.0) if delivered else 0.0
+        # numeric columns come back as Decimal
+        for key in ("avg_lead_days", "vat", "balance", "fabric_qty", "fabric_cost"):
+            row[key] = float(row[key] or 0.0)
+        return row
+
+    def _linked_revenue(self, domain, dom_sale):
+        """
+        Sum of amount_total of the sale orders in ``dom_sale`` linked to the tailor
+        orders matching ``domain`` (each sale order counted once), summed by PostgreSQL.
+        """
+        TailorOrder = self.env["tailor.order"].sudo()
+        Sale = self.env["sale.order"].sudo()
+        TailorOrder.flush_model(["sale_order_id"])
+        Sale.flush_model(["amount_total"])
+        orders = TailorOrder._where_calc(domain)
+        sales = Sale._where_calc(dom_sale)
+        self.env.cr.execute(SQL(
+            """
+            SELECT COALESCE(SUM(%(amount)s), 0.0)
+              FROM %(s_from)s
+             WHERE %(s_where)s
+               AND %(sale_id)s IN (SELECT %(link)s FROM %(o_from)s WHERE %(o_where)s)
+            """,
+            amount=SQL.identifier(Sale._table, "amount_total"),
+            sale_id=SQL.identifier(Sale._table, "id"),
+            s_from=sales.from_clause,
+            s_where=sales.where_clause or SQL("TRUE"),
+            link=SQL.identifier(TailorOrder._table, "sale_order_id"),
+            o_from=orders.from_clause,
+            o_where=orders.where_clause or SQL("TRUE"),
+        ))
+        return float(self.env.cr.fetchone()[0])
 
-        # Conversion Rate (Confirmed / Total Quotations) * 100
-        total_quotations = Sale.search_count(dom_sale + [
-            ("state", "in", ("draft", "sent", "sale", "done")),
-        ])
-        confirmed_sale_orders = Sale.search_count(dom_sale + [
-            ("state", "in", ("sale", "done")),
-        ])
-        showroom_conversion_rate = (confirmed_sale_orders / total_quotations * 100.0) if total_quotations else 0.0
-
-        # Sales performance (sum amount_total grouped by user_id)
-        rg_sales_perf = Sale.read_group(
-            dom_sale + [("state", "in", ("sale", "done"))],
-            ["amount_total:sum"],
-            ["user_id"],
-            lazy=False,
-        )
-        sales_performance = []
-        for r in rg_sales_perf:
-            sp = r.get("user_id")
-            sales_performance.append({
-                "label": sp[1] if sp else "Unknown",
-                "value": round(r.get("amount_total_sum") or 0.0, 2),
-            })
-
-        total_vat = sum(orders.mapped("vat_amount")) if orders else 0.0
-        total_balance_due = sum(orders.mapped("balance")) if orders else 0.0
-
-        # Missing docs
-        doc_domain = [("is_missing", "=", True)] + dom_docs
-        if orders:
-            doc_domain = [("tailor_order_id", "in", orders.ids), ("is_missing", "=", True)]
-            if dom_docs:
-                doc_domain += dom_docs
-        missing_docs_count = Docs.search_count(doc_domain)
-
-        # QC pass rate
-        qc_pass = delivered.filtered(lambda o: bool(o.qc_approved))
-        qc_pass_rate = (len(qc_pass) / len(delivered) * 100.0) if delivered else 0.0
-
-        # Accessories qty
-        accessory_qty = 0.0
-        for o in orders:
-            for line in o.accessory_line_ids:
-                accessory_qty += float(line.quantity or 0.0)
-
-        # Fabric meters
-        fabric_m = sum(orders.mapped("fabric_qty")) if orders else 0.0
-
-        # ✅ Profitability (uses YOUR field: fabric_total_cost)
-        fabric_cost_total = sum(orders.mapped("fabric_total_cost")) if orders else 0.0
-        gross_profit = total_revenue - fabric_cost_total
-        profit_margin_pct = (gross_profit / total_revenue * 100.0) if total_revenue else 0.0
-        avg_order_value = (total_revenue / total_orders) if total_orders else 0.0
-
-        # ----------------------------
-        # Charts helpers
-        # ----------------------------
-        # Charts helpers (✅ translated labels based on user language)
-        status_map = dict(
-            self.env["tailor.order"]
-            .with_context(lang=self.env.user.lang)
-            .fields_get(["status"])["status"]["selection"]
-        )
-
-        by_status = []
-        for key, label in status_map.items():
-            cnt = len(orders.filtered(lambda o, k=key: o.status == k))
-            by_status.append({"label": label, "value": cnt, "key": key})
-
-        def _safe_month_label(val):
-            if not val:
-                return self.env._("Unknown")
-
-            if isinstance(val, str):
-                return val
-            try:
-                return fields.Date.to_string(val)
-            except Exception:
-                return str(val)
-
-        def _rg_count(row):
-            return row.get("__count") or row.get("id_count") or 0
-
-        # Orders trend
-        order_trend = TailorOrder.read_group(domain, ["id:count"], ["order_date:month"], lazy=False)
-        orders_by_month = []
-        for row in order_trend:
-            orders_by_month.append({
-                "label": _safe_month_label(row.get("order_date:month")),
-                "value": _rg_count(row),
-            })
-
-        # Revenue trend
-        revenue_by_month = []
-        if sale_recs:
-            sale_trend = Sale.read_group(sale_domain, ["amount_total:sum"], ["date_order:month"], lazy=False)
-            for row in sale_trend:
-                month_val = row.get("date_order:month")
-                amount = row.get("amount_total_sum") or 0.0
-                revenue_by_month.append({"label": _safe_month_label(month_val), "value": amount})
-
-        # Top Tailors
-        top_tailors = TailorOrder.read_group(
-            domain + [
-                ("tailor_id", "!=", False),
-                ("status", "in", ["confirmed", "cutting", "sewing", "qc", "ready_delivery"]),
-            ],
-            ["tailor_id"],
-            ["tailor_id"],
-            lazy=False,
-        )
-        top_tailors_data = []
-        for row in top_tailors:
-            tailor = row.get("tailor_id")
-            if tailor:
-                top_tailors_data.append({
-                    "label": tailor[1],
-                    "value": (row.get("__count") or row.get("tailor_id_count") or 0),
-                })
-
-        # Missing docs by type
-        miss_by_type = Docs.read_group(doc_domain, ["id:count"], ["document_type"], lazy=False)
-        doc_type_map = dict(Docs._fields["document_type"].get_description(self.env)["selection"])
-
-        missing_by_type = []
-        for row in miss_by_type:
-            t = row.get("document_type")
-            missing_by_type.append({
-                "label": doc_type_map.get(t, t),
-                "value": (row.get("__count") or row.get("id_count") or 0),
-            })
-
-        # ✅ Top Models (by quantity) — works with your product_id + quantity
-        top_models = []
-        top_models_rg = TailorOrder.read_group(
-            domain + [("product_id", "!=", False)],
-            ["quantity:sum"],
-            ["product_id"],
-            orderby="quantity_sum desc",
-            limit=10,
-            lazy=False,
-        )
-        for row in top_models_rg:
-            prod = row.get("product_id")
-            top_models.append({
-                "label": prod[1] if prod else self.env._("Unknown"),
-                "value": row.get("quantity_sum") or 0.0,
-            })
-
-        # ✅ Top Fabrics (YOUR FIELD is fabric_type Many2one)
-        top_fabrics = []
-        top_fabrics_rg = TailorOrder.read_group(
-            domain + [("fabric_type", "!=", False)],
-            ["fabric_qty:sum"],
-            ["fabric_type"],
-            orderby="fabric_qty_sum desc",
-            limit=10,
-            lazy=False,
-        )
-        for row in top_fabrics_rg:
-            f = row.get("fabric_type")
-            top_fabrics.append({
-                "label": f[1] if f else "Unknown",
-                "value": row.get("fabric_qty_sum") or 0.0,
-            })
-
-        # ✅ FIXED: Revenue vs Fabric Cost vs Profit (by Month)
-        rev_map = {r["label"]: float(r["value"] or 0.0) for r in revenue_by_month}
-
-        cost_trend = TailorOrder.read_group(
-            domain,
-            ["fabric_total_cost:sum"],
-            ["order_date:month"],
-            lazy=False,
-        )
-        cost_map = {}
-        for row in cost_trend:
-            m_label = _safe_month_label(row.get("order_date:month"))
-            cost_map[m_label] = float(row.get("fabric_total_cost_sum") or 0.0)
-
-        months = sorted(set(list(rev_map.keys()) + list(cost_map.keys())))
+    @api.model
+    @tools.ormcache("lang")
+    def _status_map(self, lang):
+        """
+        Translated tailor.order status labels, computed once per language and
+        shared read-only by every user of the registry.
+        """
+        return MappingProxyType(dict(
+            self.env["tailor.order"].with_context(lang=lang).fields_get(["status"])["status"]["selection"]
+        ))
 
-        rev_cost_profit_by_month = []
-        for m in months:
-            r = float(rev_map.get(m, 0.0))
-            c = float(cost_map.get(m, 0.0))
-            rev_cost_profit_by_month.append({
-                "label": m,
-                "revenue": round(r, 2),
-                "fabric_cost": round(c, 2),
-                "profit": round(r - c, 2),
-            })
+    @api.model
+    @tools.ormcache("lang")
+    def _doc_type_map(self, lang):
+        """Translated customer.documents type labels, shared like :meth:`_status_map`."""
+        env = self.with_context(lang=lang).env
+        return MappingProxyType(dict(
+            env["customer.documents"]._fields["document_type"].get_description(env)["selection"]
+        ))
 
+    def _monthly_trends(self, domain, dom_sale, lang):
+        """
+        Orders and fabric cost per month of order_date, plus revenue of the linked
+        sale orders (each counted once) per month of date_order, in one statement.
+        Returns (label, orders, fabric_cost, revenue or None) rows, months ascending,
+        unknown last.
+        """
+        TailorOrder = self.env["tailor.order"].sudo()
+        Sale = self.env["sale.order"].sudo()
+        TailorOrder.flush_model(["order_date", "fabric_total_cost", "sale_order_id"])
+        Sale.flush_model(["date_order", "amount_total"])
+        orders = TailorOrder._where_calc(domain)
+        sales = Sale._where_calc(dom_sale)
+        self.env.cr.execute(SQL(
+            """
+            WITH o AS (
+                SELECT %(order_m)s AS m, COUNT(*) AS cnt, SUM(%(cost)s) AS fcost
+                  FROM %(o_from)s
+                 WHERE %(o_where)s
+              GROUP BY 1
+            ), s AS (
+                SELECT %(sale_m)s AS m, SUM(%(amount)s) AS rev
+                  FROM %(s_from)s
+                 WHERE %(s_where)s
+                   AND %(sale_id)s IN (SELECT %(link)s FROM %(o_from)s WHERE %(o_where)s)
+              GROUP BY 1
+            )
+            SELECT COALESCE(o.m, s.m) AS m, COALESCE(o.cnt, 0), COALESCE(o.fcost, 0.0), s.rev
+              FROM o
+              FULL JOIN s ON s.m = o.m
+          ORDER BY 1 NULLS LAST
+            """,
+            order_m=month_trunc_sql(self.env, TailorOrder, "order_date"),
+            cost=SQL.identifier(TailorOrder._table, "fabric_total_cost"),
+            link=SQL.identifier(TailorOrder._table, "sale_order_id"),
+            o_from=orders.from_clause,
+            o_where=orders.where_clause or SQL("TRUE"),
+            sale_m=month_trunc_sql(self.env, Sale, "date_order"),
+            amount=SQL.identifier(Sale._table, "amount_total"),
+            sale_id=SQL.identifier(Sale._table, "id"),
+            s_from=sales.from_clause,
+            s_where=sales.where_clause or SQL("TRUE"),
+        ))
+        unknown = self.env._("Unknown")
+        return [
+            (
+                format_date(self.env, month.date(), lang_code=lang, date_format="MMMM yyyy") if month else unknown,
+                cnt, float(fcost), float(rev) if rev is not None else None,
+            )
+            for month, cnt, fcost, rev in self.env.cr.fetchall()
+        ]
+
+    def _top_breakdowns(self, domain, lang, limit=10):
+        """
+        Top products (quantity), fabrics (fabric_qty) and tailors (active orders)
+        over ``domain``: one scan of tailor_order, ranked per kind by PostgreSQL.
+        Returns {"model"|"fabric"|"tailor": [(label, value), ...]}, best first.
+        """
+        TailorOrder = self.env["tailor.order"].sudo()
+        TailorOrder.flush_model(["product_id", "quantity", "fabric_type", "fabric_qty", "tailor_id", "status"])
+        query = TailorOrder._where_calc(domain)
+        self.env.cr.execute(SQL(
+            """
+            WITH t AS (
+                SELECT %(product)s AS product_id, %(qty)s AS qty,
+                       %(fabric)s AS fabric_id, %(fabric_qty)s AS fabric_qty,
+                       %(tailor)s AS tailor_id, %(status)s AS status
+                  FROM %(from_clause)s
+                 WHERE %(where_clause)s
+            ), g AS (
+                SELECT 'model' AS kind, product_id AS key, COALESCE(SUM(qty), 0) AS v
+                  FROM t WHERE product_id IS NOT NULL GROUP BY product_id
+                 UNION ALL
+                SELECT 'fabric', fabric_id, COALESCE(SUM(fabric_qty), 0)
+                  FROM t WHERE fabric_id IS NOT NULL GROUP BY fabric_id
+                 UNION ALL
+                SELECT 'tailor', tailor_id, COUNT(*)
+                  FROM t WHERE tailor_id IS NOT NULL AND status IN %(active)s GROUP BY tailor_id
+            )
+            SELECT kind, key, v
+              FROM (SELECT g.*, ROW_NUMBER() OVER (PARTITION BY kind ORDER BY v DESC, key) AS rn FROM g) ranked
+             WHERE rn <= %(limit)s
+          ORDER BY kind, rn
+            """,
+            product=SQL.identifier(TailorOrder._table, "product_id"),
+            qty=SQL.identifier(TailorOrder._table, "quantity"),
+            fabric=SQL.identifier(TailorOrder._table, "fabric_type"),
+            fabric_qty=SQL.identifier(TailorOrder._table, "fabric_qty"),
+            tailor=SQL.identifier(TailorOrder._table, "tailor_id"),
+            status=SQL.identifier(TailorOrder._table, "status"),
+            active=ACTIVE_STATUSES,
+            limit=limit,
+            from_clause=query.from_clause,
+            where_clause=query.where_clause or SQL("TRUE"),
+        ))
+        rows = defaultdict(list)
+        for kind, key, value in self.env.cr.fetchall():
+            rows[kind].append((key, value))
+
+        # ✅ display names resolved in one batch per model (products cover models + fabrics)
+        env = self.with_context(lang=lang).env
+        product_ids = [key for kind in ("model", "fabric") for key, _v in rows[kind]]
+        names = {p.id: p.display_name for p in env["product.product"].sudo().browse(product_ids)}
+        tailor_names = {u.id: u.display_name for u in env["res.users"].sudo().browse([k for k, _v in rows["tailor"]])}
         return {
-            "filters": {
-                "date_from": date_from or False,
-                "date_to": date_to or False,
-                "company_id": int(company_id) if company_id else False,
-
-                # ✅ ADDED: return new filters (nice for UI sync / debugging)
-                "tailor_id": int(tailor_id) if tailor_id else False,
-                "status": status or False,
-                "range": range or False,
-            },
-            "kpis": {
-                "total_orders": total_orders,
-                "active_orders": len(active),
-                "delivered_orders": len(delivered),
-                "cancelled_orders": len(cancelled),
-                "qc_orders": len(qc),
-                "ready_delivery_orders": len(ready_delivery),
-                "on_time_pct": round(on_time_pct, 2),
-                "avg_lead_days": round(avg_lead_days, 2),
-                "total_revenue": round(total_revenue, 2),
-                "total_vat": round(total_vat, 2),
-                "total_balance_due": round(total_balance_due, 2),
-                "missing_docs": missing_docs_count,
-                "qc_pass_rate": round(qc_pass_rate, 2),
-                "accessory_qty": round(accessory_qty, 2),
-                "fabric_m": round(fabric_m, 2),
-
-                # ✅ SHOWROOM KPIs
-                "new_orders_today": new_orders_today,
-                "pending_quotations": pending_quotations,
-                "showroom_conversion_rate": round(showroom_conversion_rate, 2),
-
-                # ✅ Profitability
-                "fabric_cost_total": round(fabric_cost_total, 2),
-                "gross_profit": round(gross_profit, 2),
-                "profit_margin_pct": round(profit_margin_pct, 2),
-                "avg_order_value": round(avg_order_value, 2),
-            },
-            "charts": {
-                "orders_by_status": by_status,
-                "orders_by_month": orders_by_month,
-                "revenue_by_month": revenue_by_month,
-                "top_tailors": top_tailors_data,
-                "missing_docs_by_type": missing_by_type,
-
-                # ✅ SHOWROOM chart
-                "sales_performance": sales_performance,
-
-                # ✅ NEW
-                "top_models": top_models,
-                "top_fabrics": top_fabrics,
-                "rev_cost_profit_by_month": rev_cost_profit_by_month,
-            },
+            "model": [(names[key], float(v)) for key, v in rows["model"]],
+            "fabric": [(names[key], float(v)) for key, v in rows["fabric"]],
+            "tailor": [(tailor_names[key], v) for key, v in rows["tailor"]],
         }
@@ -8,9 +8,8 @@ from odoo import models, api, fields
 class TailorExecutiveDashboardKPIs(models.AbstractModel):
     _inherit = "tailor.executive.dashboard"
 
-    # ✅ FIX: accept the new kwargs coming from JS (tailor_id, status, range)
-    @api.model
-    def get_kpis(self, date_from=False, date_to=False, company_id=False, tailor_id=False, status=False, range=False):
+    def _kpis_domains(self, date_from=False, date_to=False, company_id=False, tailor_id=False, status=False):
+        """(tailor.order, customer.documents, sale.order) domains for the dashboard filters."""
         domain = []
         dom_docs = []
         dom_sale = []
@@ -20,14 +19,17 @@ class TailorExecutiveDashboardKPIs(models.AbstractModel):
             dom_sale += [("company_id", "=", int(company_id))]
 
         if date_from:
-            domain += [("order_date", ">=", date_from)]
-            dom_docs += [("create_date", ">=", date_from)]
-            dom_sale += [("date_order", ">=", date_from)]
+            dt_from = fields.Datetime.to_datetime(date_from)
+            domain += [("order_date", ">=", dt_from)]
+            dom_docs += [("create_date", ">=", dt_from)]
+            dom_sale += [("date_order", ">=", dt_from)]
 
+        # ✅ half-open [date_from, date_to + 1 day): no sub-second gap at 23:59:59
         if date_to:
-            domain += [("order_date", "<=", date_to + " 23:59:59")]
-            dom_docs += [("create_date", "<=", date_to + " 23:59:59")]
-            dom_sale += [("date_order", "<=", date_to + " 23:59:59")]
+            dt_to_excl = fields.Datetime.to_datetime(date_to) + timedelta(days=1)
+            domain += [("order_date", "<", dt_to_excl)]
+            dom_docs += [("create_date", "<", dt_to_excl)]
+            dom_sale += [("date_order", "<", dt_to_excl)]
 
         # ✅ ADDED: Tailor filter
         if tailor_id:
@@ -37,72 +39,58 @@ class TailorExecutiveDashboardKPIs(models.AbstractModel):
         if status:
             domain += [("status", "=", status)]
 
+        return domain, dom_docs, dom_sale
+
+    # ✅ FIX: accept the new kwargs coming from JS (tailor_id, status, range)
+    @api.model
+    def get_kpis(self, date_from=False, date_to=False, company_id=False, tailor_id=False, status=False, range=False):
+        domain, dom_docs, dom_sale = self._kpis_domains(date_from, date_to, company_id, tailor_id, status)
+
         lang = self.env.context.get("lang") or self.env.user.lang or "ar_001"
 
         TailorOrder = self.env["tailor.order"].sudo().with_context(lang=lang)
         Docs = self.env["customer.documents"].sudo().with_context(lang=lang)
         Sale = self.env["sale.order"].sudo().with_context(lang=lang)
 
-        orders = TailorOrder.search(domain)
-
-        total_orders = len(orders)
-        delivered = orders.filtered(lambda o: o.status == "delivered")
-        cancelled = orders.filtered(lambda o: o.status == "cancel")
+        # ✅ ids only; no order columns are read into Python
+        order_ids = TailorOrder.search(domain).ids
 
-        active = orders.filtered(lambda o: o.status in (
-            "confirmed", "cutting", "sewing", "qc", "ready_delivery",
-        ))
-
-        qc = orders.filtered(lambda o: o.status == "qc")
-        ready_delivery = orders.filtered(lambda o: o.status == "ready_delivery")
-
-        # On-time delivery %
-        on_time_count = 0
-        for o in delivered:
-            if o.delivery_date and o.status_changed_on and o.status_changed_on <= o.delivery_date:
-                on_time_count += 1
-        on_time_pct = (on_time_count / len(delivered) * 100.0) if delivered else 0.0
-
-        # Avg lead time in days
-        lead_days = []
-        for o in delivered:
-            if o.order_date and o.status_changed_on:
-                delta = o.status_changed_on - o.order_date
-                lead_days.append(delta.total_seconds() / 86400.0)
-        avg_lead_days = (sum(lead_days) / len(lead_days)) if lead_days else 0.0
+        # ✅ scalar KPIs in one aggregate query (no per-order Python loops)
+        k = self._order_kpis(domain)
+        total_orders = k["total"]
+        on_time_pct = k["on_time_pct"]
+        avg_lead_days = k["avg_lead_days"]
 
         # Financials
-        sale_ids = orders.mapped("sale_order_id").ids
-        sale_domain = [("id", "in", sale_ids)] + dom_sale if sale_ids else [("id", "=", 0)]
-        sale_recs = Sale.search(sale_domain)
-        total_revenue = sum(sale_recs.mapped("amount_total")) if sale_recs else 0.0
+        total_revenue = self._linked_revenue(domain, dom_sale)
 
-        total_vat = sum(orders.mapped("vat_amount")) if orders else 0.0
-        total_balance_due = sum(orders.mapped("balance")) if orders else 0.0
+        total_vat = k["vat"]
+        total_balance_due = k["balance"]
 
         # Missing required docs
         doc_domain = [("is_missing", "=", True)] + dom_docs
-        if orders:
-            doc_domain = [("tailor_order_id", "in", orders.ids), ("is_missing", "=", True)]
+        if order_ids:
+            doc_domain = [("tailor_order_id", "in", order_ids), ("is_missing", "=", True)]
             if dom_docs:
                 doc_domain += dom_docs
         missing_docs_count = Docs.search_count(doc_domain)
 
         # QC pass rate
-        qc_pass = delivered.filtered(lambda o: bool(o.qc_approved))
-        qc_pass_rate = (len(qc_pass) / len(delivered) * 100.0) if delivered else 0.0
+        qc_pass_rate = k["qc_pass_rate"]
 
-        # Accessories qty
+        # Accessories qty (✅ summed by PostgreSQL, no line records loaded)
         accessory_qty = 0.0
-        for o in orders:
-            for line in o.accessory_line_ids:
-                accessory_qty += float(line.quantity or 0.0)
+        if order_ids:
+            rg = self.env["tailor.accessory.line"].sudo().read_group(
+                [("tailor_order_id", "in", order_ids)], ["quantity:sum"], [],
+            )
+            accessory_qty = float((rg and rg[0].get("quantity")) or 0.0)
 
         # Fabric meters
-        fabric_m = sum(orders.mapped("fabric_qty")) if orders else 0.0
+        fabric_m = k["fabric_qty"]
 
         # ✅ Profitability
-        fabric_cost_total = sum(orders.mapped("fabric_total_cost")) if orders else 0.0
+        fabric_cost_total = k["fabric_cost"]
         gross_profit = float(total_revenue or 0.0) - float(fabric_cost_total or 0.0)
         profit_margin_pct = (gross_profit / total_revenue * 100.0) if total_revenue else 0.0
         avg_order_value = (total_revenue / total_orders) if total_orders else 0.0
@@ -110,23 +98,24 @@ class TailorExecutiveDashboardKPIs(models.AbstractModel):
         # ✅ SHOWROOM KPIs
         today = fields.Date.context_today(self)
         today_start = fields.Datetime.to_datetime(today)
-        today_end = today_start + timedelta(days=1) - timedelta(seconds=1)
+        today_end = today_start + timedelta(days=1)
 
         new_orders_today = Sale.search_count(dom_sale + [
             ("date_order", ">=", today_start),
-            ("date_order", "<=", today_end),
+            ("date_order", "<", today_end),
         ])
 
-        pending_quotations = Sale.search_count(dom_sale + [
-            ("state", "in", ("draft", "sent")),
-        ])
+        # ✅ quotation / confirmed counts from one grouped query instead of three round-trips
+        sale_states = {
+            r["state"]: r["__count"]
+            for r in Sale.read_group(dom_sale, ["state"], ["state"], lazy=False)
+        }
+        # Pending Quotations (draft + sent)
+        pending_quotations = sale_states.get("draft", 0) + sale_states.get("sent", 0)
 
-        total_quotations = Sale.search_count(dom_sale + [
-            ("state", "in", ("draft", "sent", "sale", "done")),
-        ])
-        confirmed_sale_orders = Sale.search_count(dom_sale + [
-            ("state", "in", ("sale", "done")),
-        ])
+        # Conversion Rate (Confirmed / Total Quotations) * 100
+        confirmed_sale_orders = sale_states.get("sale", 0) + sale_states.get("done", 0)
+        total_quotations = pending_quotations + confirmed_sale_orders
         showroom_conversion_rate = (confirmed_sale_orders / total_quotations * 100.0) if total_quotations else 0.0
 
         rg_sales_perf = Sale.read_group(
@@ -146,75 +135,36 @@ class TailorExecutiveDashboardKPIs(models.AbstractModel):
         # ----------------------------
         # Charts helpers
         # ----------------------------
-        def _safe_month_label(val):
-            if not val:
-                return self.env._("Unknown")
-
-            if isinstance(val, str):
-                return val
-            try:
-                return fields.Date.to_string(val)
-            except Exception:
-                return str(val)
-
-        def _rg_count(row):
-            return row.get("__count") or row.get("id_count") or 0
-
         # Orders by status
         # Charts helpers (✅ translated labels based on user language)
-        status_map = dict(
-            self.env["tailor.order"]
-            .with_context(lang=self.env.user.lang)
-            .fields_get(["status"])["status"]["selection"]
-        )
+        status_map = self._status_map(self.env.user.lang)
 
-        by_status = []
-        for key, label in status_map.items():
-            cnt = len(orders.filtered(lambda o, k=key: o.status == k))
-            by_status.append({"label": label, "value": cnt, "key": key})
-
-        orders_by_status = []
-        for key, label in status_map.items():
-            cnt = len(orders.filtered(lambda o, k=key: o.status == k))
-            orders_by_status.append({"label": label, "value": cnt})
-
-        # Orders by month
-        order_trend = TailorOrder.read_group(domain, ["id:count"], ["order_date:month"], lazy=False)
-        orders_by_month = []
-        for row in order_trend:
-            orders_by_month.append({
-                "label": _safe_month_label(row.get("order_date:month")),
-                "value": _rg_count(row),
-            })
-
-        # Revenue by month
-        revenue_by_month = []
-        if sale_recs:
-            sale_trend = Sale.read_group(sale_domain, ["amount_total:sum"], ["date_order:month"], lazy=False)
-            for row in sale_trend:
-                month_val = row.get("date_order:month")
-                amount = row.get("amount_total_sum") or 0.0
-                revenue_by_month.append({"label": _safe_month_label(month_val), "value": amount})
-
-        # Top tailors
-        top_tailors_rg = TailorOrder.read_group(
-            domain + [("tailor_id", "!=", False),
-                      ("status", "in", ["confirmed", "cutting", "sewing", "qc", "ready_delivery"])],
-            ["tailor_id"],
-            ["tailor_id"],
-            lazy=False,
-        )
-        top_tailors = []
-        for row in top_tailors_rg:
-            t = row.get("tailor_id")
-            top_tailors.append({
-                "label": t[1] if t else "Unknown",
-                "value": (row.get("__count") or row.get("tailor_id_count") or 0),
-            })
+        # ✅ counts per status from one GROUP BY instead of a filtered() per status
+        status_counts = {
+            r["status"]: r["__count"]
+            for r in TailorOrder.read_group(domain, ["status"], ["status"], lazy=False)
+        }
+        orders_by_status = [
+            {"label": label, "value": status_counts.get(key, 0)}
+            for key, label in status_map.items()
+        ]
+
+        # ✅ orders / fabric cost / revenue per month from one statement
+        trends = self._monthly_trends(domain, dom_sale, lang)
+        orders_by_month = [
+            {"label": label, "value": cnt} for label, cnt, _cost, _rev in trends if cnt
+        ]
+        revenue_by_month = [
+            {"label": label, "value": rev} for label, _cnt, _cost, rev in trends if rev is not None
+        ]
+
+        # ✅ top tailors / models / fabrics ranked and limited in one statement
+        top = self._top_breakdowns(domain, lang)
+        top_tailors = [{"label": label, "value": value} for label, value in top["tailor"]]
 
         # Missing docs by type
         miss_by_type = Docs.read_group(doc_domain, ["id:count"], ["document_type"], lazy=False)
-        doc_type_map = dict(Docs._fields["document_type"].get_description(self.env)["selection"])
+        doc_type_map = self._doc_type_map(self.env.lang)
 
         missing_by_type = []
         for row in miss_by_type:
@@ -224,63 +174,22 @@ class TailorExecutiveDashboardKPIs(models.AbstractModel):
                 "value": (row.get("__count") or row.get("id_count") or 0),
             })
 
-        # ✅ Top Models (by quantity) — sort in Python (Odoo 19 safe)
-        top_models = []
-        top_models_rg = TailorOrder.read_group(
-            domain + [("product_id", "!=", False)],
-            ["quantity:sum"],
-            ["product_id"],
-            lazy=False,
-        )
-        top_models_rg = sorted(top_models_rg, key=lambda r: r.get("quantity_sum") or 0.0, reverse=True)[:10]
-        for row in top_models_rg:
-            prod = row.get("product_id")
-            top_models.append({
-                "label": prod[1] if prod else self.env._("Unknown"),
-                "value": row.get("quantity_sum") or 0.0,
-            })
+        # ✅ Top Models (by quantity)
+        top_models = [{"label": label, "value": value} for label, value in top["model"]]
 
-        # ✅ Top Fabrics — sort in Python (Odoo 19 safe)
-        top_fabrics = []
-        top_fabrics_rg = TailorOrder.read_group(
-            domain + [("fabric_type", "!=", False)],
-            ["fabric_qty:sum"],
-            ["fabric_type"],
-            lazy=False,
-        )
-        top_fabrics_rg = sorted(top_fabrics_rg, key=lambda r: r.get("fabric_qty_sum") or 0.0, reverse=True)[:10]
-        for row in top_fabrics_rg:
-            f = row.get("fabric_type")
-            top_fabrics.append({
-                "label": f[1] if f else "Unknown",
-                "value": row.get("fabric_qty_sum") or 0.0,
-            })
+        # ✅ Top Fabrics
+        top_fabrics = [{"label": label, "value": value} for label, value in top["fabric"]]
 
         # ✅ Revenue vs Fabric Cost vs Profit by month — labels match
-        rev_map = {r["label"]: float(r["value"] or 0.0) for r in revenue_by_month}
-
-        cost_trend = TailorOrder.read_group(
-            domain,
-            ["fabric_total_cost:sum"],
-            ["order_date:month"],
-            lazy=False,
-        )
-        cost_map = {}
-        for row in cost_trend:
-            m_label = _safe_month_label(row.get("order_date:month"))
-            cost_map[m_label] = float(row.get("fabric_total_cost_sum") or 0.0)
-
-        months = sorted(set(list(rev_map.keys()) + list(cost_map.keys())))
-        rev_cost_profit_by_month = []
-        for m in months:
-            r = float(rev_map.get(m, 0.0))
-            c = float(cost_map.get(m, 0.0))
-            rev_cost_profit_by_month.append({
-                "label": m,
-                "revenue": round(r, 2),
-                "fabric_cost": round(c, 2),
-                "profit": round(r - c, 2),
-            })
+        rev_cost_profit_by_month = [
+            {
+                "label": label,
+                "revenue": round(rev or 0.0, 2),
+                "fabric_cost": round(cost, 2),
+                "profit": round((rev or 0.0) - cost, 2),
+            }
+            for label, _cnt, cost, rev in trends
+        ]
 
         return {
             "filters": {
@@ -295,11 +204,11 @@ class TailorExecutiveDashboardKPIs(models.AbstractModel):
             },
             "kpis": {
                 "total_orders": total_orders,
-                "active_orders": len(active),
-                "delivered_orders": len(delivered),
-                "cancelled_orders": len(cancelled),
-                "qc_orders": len(qc),
-                "ready_delivery_orders": len(ready_delivery),
+                "active_orders": k["active"],
+                "delivered_orders": k["delivered"],
+                "cancelled_orders": k["cancelled"],
+                "qc_orders": k["qc"],
+                "ready_delivery_orders": k["ready_delivery"],
                 "on_time_pct": round(on_time_pct, 2),
                 "avg_lead_days": round(avg_lead_days, 2),
                 "total_revenue": round(total_revenue, 2),
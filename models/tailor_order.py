@@ -2,16 +2,33 @@
 import base64
 import logging
 import mimetypes
+import os
+import time
+from collections import defaultdict
+from functools import lru_cache, partial
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.exceptions import UserError
 from odoo.tools.translate import _
 from odoo.tools.misc import file_open  # ✅ REQUIRED
-from odoo.tools import float_compare  # ✅ ADDED (safe numeric compare with rounding)
+from odoo.tools import config, float_compare  # ✅ ADDED (safe numeric compare with rounding)
 from datetime import timedelta
 
 _logger = logging.getLogger(__name__)
 
+# Spooled portal uploads older than this are considered orphaned (job never ran)
+_PORTAL_UPLOAD_SPOOL_MAX_AGE = 7 * 24 * 3600
+
+
+def _remove_spooled_upload(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        _logger.warning("Could not remove spooled portal upload %s", path, exc_info=True)
+
+
 # ------------------------------------------------------------
 # Static image loader (Odoo 17 / 18 / 19 safe)
 # ------------------------------------------------------------
@@ -26,12 +43,12 @@ except Exception:
     get_resource_path = None
 
 
-def _read_static_image(module_name, filename):
+def _load_static_image(module_name, filename):
     """
     Load image from:
     <module>/static/src/img/<filename>
 
-    Returns base64 bytes for Binary fields.
+    Returns base64 bytes for Binary fields (False if missing or empty).
     """
     rel_path = f"{module_name}/static/src/img/{filename}"
 
@@ -40,7 +57,7 @@ def _read_static_image(module_name, filename):
         with file_open(rel_path, "rb") as f:
             data = f.read()
             _logger.info("✅ Loaded diagram using file_open: %s (%s bytes)", rel_path, len(data))
-            return base64.b64encode(data)
+            return base64.b64encode(data) if data else False
     except Exception as e:
         _logger.warning("❌ file_open failed for %s: %s", rel_path, e)
 
@@ -66,12 +83,32 @@ def _read_static_image(module_name, filename):
         with open(path, "rb") as f:
             data = f.read()
             _logger.info("✅ Loaded diagram using open(): %s (%s bytes)", path, len(data))
-            return base64.b64encode(data)
+            return base64.b64encode(data) if data else False
     except Exception:
         _logger.exception("Failed to load image: %s", filename)
         return False
 
 
+class _StaticImageMissing(Exception):
+    """Raised inside the cache so a missing image is not memoized."""
+
+
+@lru_cache(maxsize=16)
+def _cached_static_image(module_name, filename):
+    data = _load_static_image(module_name, filename)
+    if not data:
+        raise _StaticImageMissing(filename)
+    return data
+
+
+def _read_static_image(module_name, filename):
+    # ✅ read + encoded once per process; a missing file is retried on the next call
+    try:
+        return _cached_static_image(module_name, filename)
+    except _StaticImageMissing:
+        return False
+
+
 # ------------------------------------------------------------
 # Default diagrams (module-level)
 # ------------------------------------------------------------
@@ -274,12 +311,26 @@ class TailorOrder(models.Model):
     status_changed_on = fields.Datetime(string="Status Changed On", readonly=True)
     status_changed_by = fields.Many2one("res.users", string="Status Changed By", readonly=True)
 
+    def init(self):
+        # dashboards filter / group orders by company, status and order date
+        tools.create_index(
+            self.env.cr, "tailor_order_company_status_date_idx", self._table,
+            ["company_id", "status", "order_date"],
+        )
+        # sale order -> tailor orders lookups (revenue, sync on sale.order write)
+        tools.create_index(
+            self.env.cr, "tailor_order_sale_order_id_idx", self._table,
+            ["sale_order_id"], where="sale_order_id IS NOT NULL",
+        )
+
     def _load_default_diagrams_if_missing(self):
+        arabic = _read_static_image("tailor_management", "arabic_kandura.png")
+        kuwaiti = _read_static_image("tailor_management", "kuwaiti_kandura.png")
         for order in self:
             if not order.arabic_diagram:
-                order.arabic_diagram = _read_static_image("tailor_management", "arabic_kandura.png")
+                order.arabic_diagram = arabic
             if not order.kuwaiti_diagram:
-                order.kuwaiti_diagram = _read_static_image("tailor_management", "kuwaiti_kandura.png")
+                order.kuwaiti_diagram = kuwaiti
 
     # -------------------- Measurements --------------------
     length = fields.Float(string="Length", digits=(6, 2))
@@ -813,11 +864,14 @@ class TailorOrder(models.Model):
 
     # Diagrams
     def _ensure_default_diagrams(self):
+        # ✅ loaded once for the whole batch (and cached per process)
+        arabic = _default_arabic_diagram(self)
+        kuwaiti = _default_kuwaiti_diagram(self)
         for rec in self:
             if not rec.arabic_diagram:
-                rec.arabic_diagram = _default_arabic_diagram(rec)
+                rec.arabic_diagram = arabic
             if not rec.kuwaiti_diagram:
-                rec.kuwaiti_diagram = _default_kuwaiti_diagram(rec)
+                rec.kuwaiti_diagram = kuwaiti
 
     def action_load_default_diagrams(self):
         self._ensure_default_diagrams()
@@ -910,53 +964,68 @@ class TailorOrder(models.Model):
         return self.env["res.users"]
 
     def _schedule_activity_for_users(self, users, summary, note):
+        """
+        One To-Do per (order, user). ``summary`` is a string or a callable
+        order -> string; orders sharing a summary are scheduled together, since
+        activity_schedule() creates the activities of a recordset in one batch.
+        """
         activity_type = self.env.ref("mail.mail_activity_data_todo", raise_if_not_found=False)
-        if not activity_type:
+        if not activity_type or not users or not self:
             return
 
-        for order in self:
+        if callable(summary):
+            by_summary = defaultdict(lambda: self.browse())
+            for order in self:
+                by_summary[summary(order)] |= order
+        else:
+            by_summary = {summary: self}
+
+        today = fields.Date.today()
+        for text, orders in by_summary.items():
             for user in users:
-                order.activity_schedule(
+                orders.activity_schedule(
                     activity_type_id=activity_type.id,
                     user_id=user.id,
-                    summary=summary,
+                    summary=text,
                     note=note,
-                    date_deadline=fields.Date.today(),
-                )
-
-    def _schedule_stage_activity(self, stage):
-        for order in self:
-            if stage == "confirmed":
-                users = order._users_in_group("tailor_management.group_tailor_tailor")
-                order._schedule_activity_for_users(
-                    users,
-                    summary=f"Start Production ({order.name})",
-                    note="Order is confirmed. Start cutting/sewing and update the workflow.",
+                    date_deadline=today,
                 )
 
-            elif stage == "qc":
-                users = order._users_in_group("tailor_management.group_tailor_qc")
-                order._schedule_activity_for_users(
-                    users,
-                    summary=f"QC Required ({order.name})",
-                    note="Please verify measurements, fabric, stitching, finishing and approve QC.",
-                )
+    _STAGE_ACTIVITIES = {
+        "confirmed": (
+            "tailor_management.group_tailor_tailor",
+            "Start Production (%s)",
+            "Order is confirmed. Start cutting/sewing and update the workflow.",
+        ),
+        "qc": (
+            "tailor_management.group_tailor_qc",
+            "QC Required (%s)",
+            "Please verify measurements, fabric, stitching, finishing and approve QC.",
+        ),
+        "ready_delivery": (
+            "tailor_management.group_tailor_sales",
+            "Create Invoice (%s)",
+            "Order is Ready for Delivery. Please create the invoice and arrange the delivery handover.",
+        ),
+        "delivered": (
+            "tailor_management.group_tailor_admin",
+            "Check Delivery (%s)",
+            "Order is marked Delivered. Please verify delivery completion and archive/save documents.",
+        ),
+    }
 
-            elif stage == "ready_delivery":
-                users = order._users_in_group("tailor_management.group_tailor_sales")
-                order._schedule_activity_for_users(
-                    users,
-                    summary=f"Create Invoice ({order.name})",
-                    note="Order is Ready for Delivery. Please create the invoice and arrange the delivery handover.",
-                )
+    def _schedule_stage_activity(self, stage):
+        spec = self._STAGE_ACTIVITIES.get(stage)
+        if not spec or not self:
+            return
 
-            elif stage == "delivered":
-                users = order._users_in_group("tailor_management.group_tailor_admin")
-                order._schedule_activity_for_users(
-                    users,
-                    summary=f"Check Delivery ({order.name})",
-                    note="Order is marked Delivered. Please verify delivery completion and archive/save documents.",
-                )
+        group_xmlid, summary, note = spec
+        users = self._users_in_group(group_xmlid)
+        self._schedule_activity_for_users(
+            users,
+            summary=lambda order: summary % order.name,
+            note=note,
+        )
 
     # ✅ NEW: Auto subscribe followers for the order
     def _auto_subscribe_order_followers(self):
@@ -1852,7 +1921,8 @@ class CustomerMeasurements(models.Model):
     fitting_style = fields.Char(string="Fitting Style")
     measurement_notes = fields.Text(string="Measurement Notes")
 
-    display_name = fields.Char(compute="_compute_display_name", store=True)
+    # stored for _rec_name searches; computed at INSERT time (no follow-up UPDATE)
+    display_name = fields.Char(compute="_compute_display_name", store=True, precompute=True, index="trigram")
 
     front_design = fields.Selection(
         [("plain", "Plain"), ("design1", "Design Option 1"), ("design2", "Design Option 2")])
@@ -1869,12 +1939,27 @@ class CustomerMeasurements(models.Model):
     pocket_key_left = fields.Boolean(string="Key Pocket (Left)")
     pocket_key_right = fields.Boolean(string="Key Pocket (Right)")
 
+    def init(self):
+        # latest-measurement lookups (per sale order / per customer) walk these
+        # indexes in (create_date DESC, id DESC) order instead of sorting
+        tools.create_index(
+            self.env.cr, "customer_measurements_so_create_idx", self._table,
+            ["sale_order_id", "create_date DESC", "id DESC"],
+        )
+        tools.create_index(
+            self.env.cr, "customer_measurements_partner_create_idx", self._table,
+            ["partner_id", "create_date DESC", "id DESC"],
+        )
+
     @api.depends("partner_id", "measurement_date", "garment_template")
     def _compute_display_name(self):
+        # one batched read of partner names instead of a lazy load per record
+        self.mapped("partner_id").read(["name"])
+        templates = dict(self._fields["garment_template"].selection)
         for rec in self:
             customer = rec.partner_id.name or "Customer"
             date = rec.measurement_date or "No Date"
-            template = dict(self._fields["garment_template"].selection).get(rec.garment_template, "No Template")
+            template = templates.get(rec.garment_template, "No Template")
             rec.display_name = f"{customer} - {template} - {date}"
 
     @api.onchange("partner_id", "garment_template")
@@ -1923,7 +2008,14 @@ class CustomerDocuments(models.Model):
     name = fields.Char(string="Document Name", required=True, translate=True)
 
 
-    file = fields.Binary(string="File", attachment=True, required=False)
+    # ✅ Legacy single-file field: read-through view of the latest attachment
+    # (the binary is stored once, in attachment_ids)
+    file = fields.Binary(
+        string="File",
+        compute="_compute_latest_file",
+        inverse="_inverse_latest_file",
+        required=False,
+    )
     filename = fields.Char(string="File Name")
 
     attachment_ids = fields.Many2many(
@@ -1968,38 +2060,48 @@ class CustomerDocuments(models.Model):
     is_required = fields.Boolean(string="Required", default=True)
     is_missing = fields.Boolean(string="Missing", compute="_compute_is_missing", store=True)
 
-    @api.depends("file", "attachment_ids", "is_required")
+    @api.depends("attachment_ids")
+    def _compute_latest_file(self):
+        for rec in self:
+            # ir.attachment is ordered "id desc": first one is the latest
+            latest = rec.attachment_ids[:1]
+            rec.file = latest.datas if latest else False
+
+    def _inverse_latest_file(self):
+        self.filtered("file")._ensure_binary_file_is_attachment()
+
+    @api.depends("attachment_ids", "is_required")
     def _compute_is_missing(self):
         for rec in self:
-            has_any_file = bool(rec.file) or bool(rec.attachment_ids)
-            rec.is_missing = bool(rec.is_required) and not has_any_file
+            rec.is_missing = bool(rec.is_required) and not rec.attachment_ids
 
     def _schedule_document_activity(self, users, summary, note):
         activity_type = self.env.ref("mail.mail_activity_data_todo", raise_if_not_found=False)
-        if not activity_type:
+        if not activity_type or not users or not self:
             return
 
-        Activity = self.env["mail.activity"].sudo()
-
-        for doc in self:
-            for user in users:
-                exists = Activity.search_count([
-                    ("res_model", "=", doc._name),
-                    ("res_id", "=", doc.id),
-                    ("user_id", "=", user.id),
-                    ("activity_type_id", "=", activity_type.id),
-                    ("summary", "=", summary),
-                    ("date_done", "=", False),
-                ])
-                if exists:
-                    continue
-
-                doc.activity_schedule(
+        # ✅ open activities of all documents / users in one read
+        existing = self.env["mail.activity"].sudo().search_read([
+            ("res_model", "=", self._name),
+            ("res_id", "in", self.ids),
+            ("user_id", "in", users.ids),
+            ("activity_type_id", "=", activity_type.id),
+            ("summary", "=", summary),
+            ("date_done", "=", False),
+        ], ["res_id", "user_id"], load=None)
+        scheduled = {(a["res_id"], a["user_id"]) for a in existing}
+
+        # ✅ one activity_schedule() per user, like TailorOrder._schedule_activity_for_users
+        today = fields.Date.today()
+        for user in users:
+            docs = self.filtered(lambda d: (d.id, user.id) not in scheduled)
+            if docs:
+                docs.activity_schedule(
                     activity_type_id=activity_type.id,
                     user_id=user.id,
                     summary=summary,
                     note=note,
-                    date_deadline=fields.Date.today(),
+                    date_deadline=today,
                 )
 
     def _ensure_binary_file_is_attachment(self):
@@ -2025,6 +2127,58 @@ class CustomerDocuments(models.Model):
 
             rec.sudo().write({"attachment_ids": [(4, att.id)]})
 
+    def _portal_attach_raw(self, raw, filename, mimetype):
+        """
+        ✅ Create + link one attachment from raw bytes (portal uploads).
+        Single write: attachment, upload date and legacy filename together.
+        """
+        self.ensure_one()
+        doc = self.sudo()
+        doc.write({
+            "attachment_ids": [(0, 0, {
+                "name": filename,
+                "raw": raw,
+                "res_model": doc._name,
+                "res_id": doc.id,
+                "mimetype": mimetype,
+            })],
+            "upload_date": self.env.cr.now(),  # refresh ordering in lists
+            "filename": filename,
+        })
+        return doc.attachment_ids.sorted("id")[-1:]
+
+    @api.model
+    def _portal_upload_spool_dir(self):
+        """Filestore folder holding large portal uploads until their job attaches them."""
+        return os.path.join(config.filestore(self.env.cr.dbname), "tailor_portal_uploads")
+
+    def _portal_finalize_attachment(self, tmp_path, filename, mimetype):
+        """
+        queue_job entry point for large portal uploads: attach the spooled
+        file, then remove it from the filestore temp folder once committed.
+        """
+        self.ensure_one()
+        if not os.path.exists(tmp_path):
+            _logger.warning("Portal upload %s already processed or expired", tmp_path)
+            return
+        with open(tmp_path, "rb") as f:
+            raw = f.read()
+        if raw:
+            self._portal_attach_raw(raw, filename, mimetype)
+        # ✅ only after commit: a retried / rolled back job still finds the file
+        self.env.cr.postcommit.add(partial(_remove_spooled_upload, tmp_path))
+
+    @api.autovacuum
+    def _gc_portal_upload_spool(self):
+        """Drop spooled portal uploads whose job never ran (cancelled, failed, lost)."""
+        spool = self._portal_upload_spool_dir()
+        if not os.path.isdir(spool):
+            return
+        cutoff = time.time() - _PORTAL_UPLOAD_SPOOL_MAX_AGE
+        for entry in os.scandir(spool):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                _remove_spooled_upload(entry.path)
+
     def _is_admin(self):
         return (
                 self.env.user.has_group("tailor_management.group_tailor_admin")
@@ -2069,12 +2223,7 @@ class CustomerDocuments(models.Model):
                     if self._m2m_removes_existing(rec, commands):
                         raise UserError(_("Only Admin/Managers can delete/remove document files."))
 
-        res = super(CustomerDocuments, self).write(vals)
-
-        if "file" in vals and vals.get("file"):
-            self._ensure_binary_file_is_attachment()
-
-        return res
+        return super(CustomerDocuments, self).write(vals)
 
     @api.model_create_multi
     def create(self, vals_list):
@@ -2101,9 +2250,6 @@ class CustomerDocuments(models.Model):
         mt_note = self.env.ref("mail.mt_note", raise_if_not_found=False)
 
         for rec in records:
-            if rec.file:
-                rec._ensure_binary_file_is_attachment()
-
             partner_ids = set()
             if rec.partner_id:
                 partner_ids.add(rec.partner_id.id)
@@ -2130,7 +2276,8 @@ class CustomerDocuments(models.Model):
         self.ensure_one()
 
         if self.attachment_ids:
-            att = self.attachment_ids.sorted(lambda a: (a.create_date or fields.Datetime.now(), a.id))[-1]
+            now = fields.Datetime.now()
+            att = self.attachment_ids.sorted(lambda a: (a.create_date or now, a.id))[-1]
             return {
                 "type": "ir.actions.act_url",
                 "url": f"/web/content/{att.id}?download=true",
@@ -96,8 +96,8 @@ class TailorAIMeasureWizard(models.TransientModel):
     def action_compute(self):
         """Call AI service, show preview results in wizard."""
         self.ensure_one()
-        url = (self.env['ir.config_parameter'].sudo().get_param('tailor_management.ai_service_url') or '').rstrip('/')
-        token = self.env['ir.config_parameter'].sudo().get_param('tailor_management.ai_service_token') or ''
+        url, token = self.env['res.config.settings']._get_ai_config()
+        url = url.rstrip('/')
         if not url:
             raise UserError(_("AI Service URL is not configured. Go to Settings → General Settings → Tailor AI."))
 